@@ -1,5 +1,13 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
 
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        from . import checks, database, querylog  # noqa: F401
+        connection_created.connect(
+            database.apply_sqlite_pragmas, dispatch_uid='core_sqlite_pragmas')
+        connection_created.connect(
+            querylog.install, dispatch_uid='core_querylog')
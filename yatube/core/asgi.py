@@ -0,0 +1,165 @@
+import asyncio
+import io
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+
+def build_environ(scope, body):
+    """WSGI-окружение для HTTP-запроса ASGI."""
+    server = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode().decode('latin1'),
+        'PATH_INFO': scope['path'].encode().decode('latin1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f'HTTP/{scope.get("http_version", "1.1")}',
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    if scope.get('client'):
+        environ['REMOTE_ADDR'] = scope['client'][0]
+    for name, value in scope.get('headers', ()):
+        name = name.decode('latin1').upper().replace('-', '_')
+        if name not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            name = f'HTTP_{name}'
+        value = value.decode('latin1')
+        if name in environ:
+            value = f'{environ[name]},{value}'
+        environ[name] = value
+    return environ
+
+
+class WsgiToAsgi:
+    """ASGI-приложение поверх WSGI-приложения Django.
+
+    Django 2.2 не умеет ни ASGI, ни асинхронных представлений, поэтому
+    представления работают как раньше, но в пуле из ASGI_THREADS потоков.
+    Тело запроса читает цикл событий ASGI-сервера. Обычный ответ Django
+    к концу представления уже целиком в памяти: поток забирает его
+    и освобождается, а отправку медленному клиенту ведёт цикл событий.
+    Потоковый ответ читает базу по мере выдачи, а соединения Django
+    привязаны к потоку, поэтому он занимает поток до конца отправки,
+    включая ожидание медленного клиента.
+    """
+
+    def __init__(self, wsgi_application, threads=None):
+        self.wsgi_application = wsgi_application
+        self.executor = ThreadPoolExecutor(
+            max_workers=threads or settings.ASGI_THREADS,
+            thread_name_prefix='asgi')
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            raise ValueError(f'Неподдерживаемый тип ASGI: {scope["type"]}')
+        body = await self.read_body(receive)
+        if body is None:
+            return
+        loop = asyncio.get_running_loop()
+        buffered = await loop.run_in_executor(
+            self.executor, self.run_wsgi, build_environ(scope, body),
+            loop, send)
+        if buffered is None:
+            return
+        start, chunks = buffered
+        await send(start)
+        for chunk in chunks:
+            await send({'type': 'http.response.body',
+                        'body': chunk, 'more_body': True})
+        await send({'type': 'http.response.body', 'body': b''})
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=True)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    @staticmethod
+    async def read_body(receive):
+        """Всё тело запроса или None, если клиент отключился."""
+        body = io.BytesIO()
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return None
+            body.write(message.get('body', b''))
+            if not message.get('more_body'):
+                return body.getvalue()
+
+    def run_wsgi(self, environ, loop, send):
+        """Вызывает приложение в потоке пула.
+
+        Обычный ответ возвращает циклу событий как (http.response.start,
+        части тела), потоковый отправляет сам и возвращает None.
+        """
+        def send_sync(message):
+            asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+        response_start = {}
+
+        def start_response(status, headers, exc_info=None):
+            if exc_info and response_start.get('sent'):
+                raise exc_info[1].with_traceback(exc_info[2])
+            response_start.update(
+                status=int(status.split(' ', 1)[0]),
+                headers=[(name.lower().encode('latin1'),
+                          value.encode('latin1'))
+                         for name, value in headers],
+            )
+
+        def start_message():
+            response_start['sent'] = True
+            return {
+                'type': 'http.response.start',
+                'status': response_start['status'],
+                'headers': response_start['headers'],
+            }
+
+        result = self.wsgi_application(environ, start_response)
+        try:
+            if is_buffered(result):
+                return start_message(), [chunk for chunk in result if chunk]
+            self.stream(result, start_message, send_sync)
+            return None
+        finally:
+            # close() шлёт request_finished: Django закрывает соединения
+            # этого потока, поэтому он вызывается здесь же.
+            close = getattr(result, 'close', None)
+            if close is not None:
+                close()
+
+    @staticmethod
+    def stream(result, start_message, send_sync):
+        started = False
+        for chunk in result:
+            if not chunk:
+                continue
+            if not started:
+                send_sync(start_message())
+                started = True
+            send_sync({'type': 'http.response.body',
+                       'body': chunk, 'more_body': True})
+        if not started:
+            send_sync(start_message())
+        send_sync({'type': 'http.response.body', 'body': b''})
+
+
+def is_buffered(result):
+    """Ответ уже в памяти, и его выдача не обращается к базе."""
+    return (isinstance(result, (list, tuple))
+            or getattr(result, 'streaming', None) is False)
@@ -0,0 +1,22 @@
+import os
+
+from django.conf import settings
+from django.core.checks import Warning, register
+
+from .template_build import is_fresh
+
+
+@register()
+def check_template_build(app_configs, **kwargs):
+    """Предупреждает об устаревшей сборке шаблонов: без DEBUG она
+    не используется, и шаблоны рендерятся из исходных."""
+    build_dir = settings.TEMPLATES_BUILD_DIR
+    if (not os.path.isdir(build_dir)
+            or is_fresh(build_dir, [settings.TEMPLATES_DIR])):
+        return []
+    return [Warning(
+        f'Шаблоны в {build_dir} собраны не из текущих исходных '
+        'и не используются.',
+        hint='Запустите manage.py build_templates.',
+        id='core.W001',
+    )]
@@ -0,0 +1,84 @@
+import zlib
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+GZIP_LEVEL = 6
+# Для ответов на лету качество ниже, чем при сборке статики: brotli
+# с quality 11 в десятки раз дороже по CPU.
+BROTLI_QUALITY = 5
+COMPRESSIBLE_TYPES = (
+    'application/javascript', 'application/json', 'application/x-ndjson',
+    'application/xml', 'image/svg+xml',
+)
+
+
+def is_compressible(content_type):
+    mime_type = content_type.split(';')[0].strip().lower()
+    return mime_type.startswith('text/') or mime_type in COMPRESSIBLE_TYPES
+
+
+def accepted_encodings(header):
+    """Кодировки из Accept-Encoding, кроме запрещённых q=0."""
+    encodings = set()
+    for part in header.split(','):
+        encoding, *params = [item.strip() for item in part.split(';')]
+        quality = 1.0
+        for param in params:
+            if param.startswith('q='):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+        if encoding and quality > 0:
+            encodings.add(encoding.lower())
+    return encodings
+
+
+def negotiate(header):
+    """Лучшая доступная кодировка для клиента или None."""
+    encodings = accepted_encodings(header)
+    if brotli is not None and 'br' in encodings:
+        return 'br'
+    if 'gzip' in encodings:
+        return 'gzip'
+    return None
+
+
+class GzipCompressor:
+
+    def __init__(self):
+        self._compressor = zlib.compressobj(
+            GZIP_LEVEL, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+
+    def compress(self, data):
+        return self._compressor.compress(data)
+
+    def flush(self):
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._compressor.flush()
+
+
+class BrotliCompressor:
+
+    def __init__(self):
+        self._compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+
+    def compress(self, data):
+        return self._compressor.process(data)
+
+    def flush(self):
+        return self._compressor.flush()
+
+    def finish(self):
+        return self._compressor.finish()
+
+
+COMPRESSORS = {
+    'gzip': GzipCompressor,
+    'br': BrotliCompressor,
+}
@@ -0,0 +1,154 @@
+import threading
+import time
+from collections import defaultdict, deque
+
+from django.conf import settings
+from django.template import TemplateDoesNotExist
+from django.template.backends.django import DjangoTemplates, Template, reraise
+
+PERCENTILES = (50, 95, 99)
+METRICS = ('total_ms', 'view_ms', 'sql_ms', 'sql_count', 'template_ms',
+           'compress_ms', 'bytes')
+
+_local = threading.local()
+
+
+class RequestMetrics:
+    """Замеры одного запроса; пишутся, пока запрос выбран в выборку."""
+
+    def __init__(self):
+        self.view_name = None
+        self.sql_count = 0
+        self.sql_ms = 0.0
+        self.template_ms = 0.0
+        self.view_started = None
+        self.view_ms = 0.0
+        self.total_ms = 0.0
+        # CPU на сжатие ответа, в том числе при выдаче потокового тела.
+        self.compress_ms = 0.0
+        self.bytes = 0
+        self._template_depth = 0
+
+    def execute(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_count += 1
+            self.sql_ms += (time.perf_counter() - started) * 1000
+
+    def as_dict(self):
+        return {metric: getattr(self, metric) for metric in METRICS}
+
+    def server_timing(self):
+        parts = [
+            f'total;dur={self.total_ms:.1f}',
+            f'view;dur={self.view_ms:.1f}',
+            f'sql;dur={self.sql_ms:.1f};desc="{self.sql_count} queries"',
+            f'tpl;dur={self.template_ms:.1f}',
+        ]
+        if self.compress_ms:
+            parts.append(f'compress;dur={self.compress_ms:.1f}')
+        return ', '.join(parts)
+
+
+def current_metrics():
+    """Замеры текущего запроса или None, если он не в выборке."""
+    return getattr(_local, 'metrics', None)
+
+
+def current_view():
+    """Имя представления, которое сейчас обрабатывает этот поток."""
+    return getattr(_local, 'view_name', None)
+
+
+def set_current_view(view_name):
+    _local.view_name = view_name
+
+
+def activate(metrics):
+    _local.metrics = metrics
+
+
+def deactivate():
+    _local.metrics = None
+
+
+class InstrumentedTemplate(Template):
+
+    def render(self, context=None, request=None):
+        metrics = current_metrics()
+        if metrics is None:
+            return super().render(context, request)
+        # Вложенный рендер (render_to_string в теге) уже входит во внешний.
+        metrics._template_depth += 1
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            metrics._template_depth -= 1
+            if not metrics._template_depth:
+                metrics.template_ms += (time.perf_counter() - started) * 1000
+
+
+class InstrumentedDjangoTemplates(DjangoTemplates):
+    """Бэкенд DjangoTemplates, шаблоны которого замеряют время рендера."""
+
+    def from_string(self, template_code):
+        return InstrumentedTemplate(
+            self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return InstrumentedTemplate(
+                self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            reraise(exc, self)
+
+
+def percentile(values, rank):
+    """Перцентиль по методу ближайшего ранга для отсортированного списка."""
+    if not values:
+        return None
+    index = max(0, -(-rank * len(values) // 100) - 1)
+    return values[index]
+
+
+class Stats:
+    """Последние INSTRUMENTATION_WINDOW замеров по каждому view_name."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._samples = defaultdict(self._window)
+
+    @staticmethod
+    def _window():
+        return deque(maxlen=settings.INSTRUMENTATION_WINDOW)
+
+    def record(self, metrics):
+        sample = metrics.as_dict()
+        with self._lock:
+            self._samples[metrics.view_name].append(sample)
+
+    def clear(self):
+        with self._lock:
+            self._samples.clear()
+
+    def summary(self):
+        with self._lock:
+            samples = {name: list(window)
+                       for name, window in self._samples.items()}
+        summary = {}
+        for name, window in sorted(samples.items()):
+            view_summary = {'count': len(window)}
+            for metric in METRICS:
+                values = sorted(sample[metric] for sample in window)
+                view_summary[metric] = {
+                    f'p{rank}': percentile(values, rank)
+                    for rank in PERCENTILES
+                }
+            summary[name] = view_summary
+        return summary
+
+
+stats = Stats()
@@ -0,0 +1,98 @@
+import statistics
+import tempfile
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+from django.template.backends.django import DjangoTemplates
+from django.test import RequestFactory
+from django.urls import resolve, reverse
+
+from core.template_build import build_templates
+from posts import counters
+from posts.models import Group, Post, User
+from posts.utils import preparation_page_obj
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает время рендера страниц лент: загрузчик без кеша '
+            '(DEBUG), кеширующий загрузчик и он же со встроенными include.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=200)
+
+    def handle(self, *args, **options):
+        pages = self.feed_pages()
+        with tempfile.TemporaryDirectory() as build_dir:
+            build_templates([settings.TEMPLATES_DIR], build_dir)
+            engines = {
+                'без кеша': self.engine([settings.TEMPLATES_DIR]),
+                'cached': self.engine([settings.TEMPLATES_DIR], cached=True),
+                'cached + inline': self.engine(
+                    [build_dir, settings.TEMPLATES_DIR], cached=True),
+            }
+            for page_name, (template_name, request, context) in pages.items():
+                self.stdout.write(self.style.MIGRATE_HEADING(page_name))
+                for engine_name, engine in engines.items():
+                    self.report(engine_name, engine, template_name, request,
+                                context, options['repeat'])
+
+    def engine(self, dirs, cached=False):
+        loaders = settings.TEMPLATES_SOURCE_LOADERS
+        if cached:
+            loaders = [('django.template.loaders.cached.Loader', loaders)]
+        return DjangoTemplates({
+            'NAME': 'benchmark',
+            'DIRS': dirs,
+            'APP_DIRS': False,
+            'OPTIONS': dict(settings.TEMPLATES[0]['OPTIONS'],
+                            loaders=loaders),
+        })
+
+    def feed_pages(self):
+        author = (User.objects.annotate(posts_count=Count('posts'))
+                  .order_by('-posts_count').first())
+        group = (Group.objects.annotate(posts_count=Count('posts'))
+                 .order_by('-posts_count').first())
+        if author is None or group is None:
+            raise CommandError('Нет постов: сначала запустите generate_data')
+        feeds = {
+            'index': ('posts/index.html', reverse('posts:index'),
+                      Post.objects.feed(), counters.get_all_count(), {}),
+            'group_list': (
+                'posts/group_list.html',
+                reverse('posts:group_list', args=(group.slug,)),
+                Post.objects.feed().filter(group=group),
+                counters.get_group_count(group.pk), {'group': group}),
+            'profile': (
+                'posts/profile.html',
+                reverse('posts:profile', args=(author.username,)),
+                Post.objects.feed().filter(author=author),
+                counters.get_author_count(author.pk), {'author': author}),
+        }
+        pages = {}
+        for name, (template_name, url, posts, count, extra) in feeds.items():
+            request = RequestFactory().get(url)
+            request.user = AnonymousUser()
+            request.resolver_match = resolve(url)
+            page_obj = preparation_page_obj(request, posts, count)
+            # Запросы к базе не должны попасть в замер рендера.
+            page_obj.object_list = list(page_obj.object_list)
+            pages[name] = (template_name, request,
+                           dict(extra, page_obj=page_obj))
+        return pages
+
+    def report(self, label, engine, template_name, request, context, repeat):
+        engine.get_template(template_name).render(context, request)
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            engine.get_template(template_name).render(context, request)
+            timings.append((time.perf_counter() - started) * 1000)
+        timings.sort()
+        self.stdout.write(
+            f'  {label}: median {statistics.median(timings):.2f} ms, '
+            f'p95 {timings[int(0.95 * (len(timings) - 1))]:.2f} ms'
+        )
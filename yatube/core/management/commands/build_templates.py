@@ -0,0 +1,17 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.template_build import build_templates
+
+
+class Command(BaseCommand):
+    help = ('Собирает шаблоны со встроенными статическими include '
+            'в TEMPLATES_BUILD_DIR для продакшен-конфигурации.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', default=settings.TEMPLATES_BUILD_DIR)
+
+    def handle(self, *args, **options):
+        built = build_templates([settings.TEMPLATES_DIR], options['output'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Собрано шаблонов: {len(built)} в {options["output"]}'))
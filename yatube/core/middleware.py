@@ -0,0 +1,260 @@
+import mimetypes
+import os
+import random
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.http import FileResponse
+from django.utils.cache import patch_vary_headers
+
+from . import compression, instrumentation
+from .routers import REPLICA_PIN_COOKIE
+from .storage import ENCODINGS, compressed_variants
+
+UNRESOLVED_VIEW = '-'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+# Меньше этого сжимать невыгодно: заголовки gzip съедят экономию.
+COMPRESS_MIN_SIZE = 200
+# Сжатый поток сбрасывается клиенту, когда набралось STREAM_FLUSH_SIZE
+# байт исходного текста или прошло STREAM_FLUSH_SECONDS с прошлого сброса:
+# сброс после каждой мелкой части почти отменяет сжатие.
+STREAM_FLUSH_SIZE = 32 * 1024
+STREAM_FLUSH_SECONDS = 1
+
+
+def measure_queries(metrics):
+    """Считает в metrics SQL всех соединений: чтения с реплик
+    (core.routers) идут не через основное."""
+    stack = ExitStack()
+    for conn in connections.all():
+        stack.enter_context(conn.execute_wrapper(metrics.execute))
+    return stack
+
+
+class InstrumentationMiddleware:
+    """Меряет SQL, рендер шаблонов, представление и размер ответа.
+
+    В выборку попадает доля запросов INSTRUMENTATION_SAMPLE_RATE; для
+    остальных middleware сводится к одному сравнению. Замеры копятся
+    в instrumentation.stats и уходят клиенту в заголовке Server-Timing.
+    Стоит первым в MIDDLEWARE, чтобы учесть запросы сессий и авторизации.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        rate = settings.INSTRUMENTATION_SAMPLE_RATE
+        if not rate or (rate < 1 and random.random() >= rate):
+            try:
+                return self.get_response(request)
+            finally:
+                instrumentation.set_current_view(None)
+        metrics = instrumentation.RequestMetrics()
+        request._instrumentation = metrics
+        instrumentation.activate(metrics)
+        started = time.perf_counter()
+        try:
+            with measure_queries(metrics):
+                response = self.get_response(request)
+            finished = time.perf_counter()
+            metrics.total_ms = (finished - started) * 1000
+            if metrics.view_started:
+                metrics.view_ms = (finished - metrics.view_started) * 1000
+        finally:
+            instrumentation.deactivate()
+            instrumentation.set_current_view(None)
+        match = getattr(request, 'resolver_match', None)
+        metrics.view_name = match.view_name if match else UNRESOLVED_VIEW
+        response['Server-Timing'] = metrics.server_timing()
+        if response.streaming:
+            response.streaming_content = self.stream(
+                response.streaming_content, metrics)
+        else:
+            metrics.bytes = len(response.content)
+            instrumentation.stats.record(metrics)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        # Имя представления нужно журналу медленных запросов core.querylog.
+        instrumentation.set_current_view(request.resolver_match.view_name)
+        metrics = getattr(request, '_instrumentation', None)
+        if metrics is not None:
+            metrics.view_started = time.perf_counter()
+
+    @staticmethod
+    def stream(content, metrics):
+        """Досчитывает размер и SQL потокового ответа по мере выдачи."""
+        try:
+            with measure_queries(metrics):
+                for chunk in content:
+                    metrics.bytes += len(chunk)
+                    yield chunk
+        finally:
+            instrumentation.stats.record(metrics)
+
+
+class ReplicaPinMiddleware:
+    """После успешной записи ставит куку, по которой core.routers.use_replica
+    читает с основной базы: автор сразу видит свой новый пост.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if (settings.REPLICA_DATABASES
+                and request.method not in SAFE_METHODS
+                and response.status_code < 400):
+            response.set_cookie(
+                REPLICA_PIN_COOKIE, '1',
+                max_age=settings.REPLICA_PIN_SECONDS, httponly=True)
+        return response
+
+
+class StaticAssetsMiddleware:
+    """Отдаёт собранную collectstatic статику из STATIC_ROOT.
+
+    Файлы с хешем в имени (из манифеста) кешируются браузером навсегда,
+    остальные — на STATIC_MAX_AGE секунд. Если клиент принимает br или
+    gzip, отдаётся заранее сжатый вариант. Список файлов читается один
+    раз при старте, поэтому после collectstatic нужен перезапуск.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        root = settings.STATIC_ROOT
+        if not root or not os.path.isdir(root):
+            raise MiddlewareNotUsed
+        self.prefix = settings.STATIC_URL
+        self.files = self.scan(root)
+        self.immutable = set(
+            getattr(staticfiles_storage, 'hashed_files', {}).values())
+
+    @staticmethod
+    def scan(root):
+        suffixes = tuple(suffix for _, suffix in ENCODINGS)
+        files = {}
+        for directory, _, filenames in os.walk(root):
+            for filename in filenames:
+                if filename.endswith(suffixes):
+                    continue
+                path = os.path.join(directory, filename)
+                name = os.path.relpath(path, root).replace(os.sep, '/')
+                files[name] = (path, compressed_variants(path))
+        return files
+
+    def __call__(self, request):
+        if (request.method not in ('GET', 'HEAD')
+                or not request.path_info.startswith(self.prefix)):
+            return self.get_response(request)
+        name = request.path_info[len(self.prefix):]
+        if name not in self.files:
+            return self.get_response(request)
+        return self.serve(request, name)
+
+    def serve(self, request, name):
+        path, variants = self.files[name]
+        accepted = {
+            part.split(';')[0].strip()
+            for part in request.META.get('HTTP_ACCEPT_ENCODING', '').split(',')
+        }
+        encoding = next((encoding for encoding in variants
+                         if encoding in accepted), None)
+        content_type = mimetypes.guess_type(name)[0]
+        response = FileResponse(
+            open(variants[encoding] if encoding else path, 'rb'),
+            content_type=content_type or 'application/octet-stream')
+        if encoding:
+            response['Content-Encoding'] = encoding
+        if variants:
+            patch_vary_headers(response, ('Accept-Encoding',))
+        response['Cache-Control'] = (
+            IMMUTABLE_CACHE_CONTROL if name in self.immutable
+            else f'public, max-age={settings.STATIC_MAX_AGE}')
+        return response
+
+
+class CompressionMiddleware:
+    """Сжимает текстовые ответы в br или gzip по Accept-Encoding.
+
+    Потоковые ответы сжимаются по частям без буферизации всего тела
+    и сбрасываются клиенту порциями по STREAM_FLUSH_SIZE байт или раз
+    в STREAM_FLUSH_SECONDS, если поток медленный. Время сжатия попадает
+    в замеры InstrumentationMiddleware (compress_ms и Server-Timing),
+    поэтому она должна стоять выше в MIDDLEWARE.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if not self.should_compress(response):
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = compression.negotiate(
+            request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if encoding is None:
+            return response
+        metrics = instrumentation.current_metrics()
+        compressor = compression.COMPRESSORS[encoding]()
+        if response.streaming:
+            response.streaming_content = self.compress_stream(
+                response.streaming_content, compressor, metrics)
+            del response['Content-Length']
+        else:
+            started = time.perf_counter()
+            content = (compressor.compress(response.content)
+                       + compressor.finish())
+            if metrics is not None:
+                metrics.compress_ms += (time.perf_counter() - started) * 1000
+            if len(content) >= len(response.content):
+                return response
+            response.content = content
+            response['Content-Length'] = str(len(content))
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = encoding
+        return response
+
+    @staticmethod
+    def should_compress(response):
+        if (response.has_header('Content-Encoding')
+                or response.status_code in (204, 304)
+                or 'no-transform' in response.get('Cache-Control', '')
+                or not compression.is_compressible(
+                    response.get('Content-Type', ''))):
+            return False
+        return response.streaming or len(response.content) >= COMPRESS_MIN_SIZE
+
+    @staticmethod
+    def compress_stream(content, compressor, metrics):
+        pending = 0
+        flushed_at = time.monotonic()
+        for chunk in content:
+            started = time.perf_counter()
+            data = compressor.compress(chunk)
+            pending += len(chunk)
+            if pending and (
+                    pending >= STREAM_FLUSH_SIZE
+                    or time.monotonic() - flushed_at >= STREAM_FLUSH_SECONDS):
+                data += compressor.flush()
+                pending = 0
+                flushed_at = time.monotonic()
+            if metrics is not None:
+                metrics.compress_ms += (time.perf_counter() - started) * 1000
+            if data:
+                yield data
+        started = time.perf_counter()
+        data = compressor.finish()
+        if metrics is not None:
+            metrics.compress_ms += (time.perf_counter() - started) * 1000
+        yield data
@@ -0,0 +1,144 @@
+import logging
+import threading
+import time
+import traceback
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import DatabaseError
+
+from . import instrumentation
+
+logger = logging.getLogger(__name__)
+
+STACK_DEPTH = 6
+EXPLAIN_CACHE_SIZE = 100
+
+
+class RateLimiter:
+    """Не больше limit событий за period секунд; лишние считаются."""
+
+    def __init__(self, limit, period):
+        self.limit = limit
+        self.period = period
+        self._lock = threading.Lock()
+        self._window_started = time.monotonic()
+        self._used = 0
+        self.suppressed = 0
+
+    def allow(self):
+        """Возвращает (разрешено ли, сколько пропущено с прошлого раза)."""
+        with self._lock:
+            now = time.monotonic()
+            if now - self._window_started >= self.period:
+                self._window_started = now
+                self._used = 0
+            if self._used >= self.limit:
+                self.suppressed += 1
+                return False, 0
+            self._used += 1
+            suppressed, self.suppressed = self.suppressed, 0
+            return True, suppressed
+
+
+class ExplainCache:
+    """Планы последних запросов, чтобы не повторять EXPLAIN на каждый."""
+
+    def __init__(self, size=EXPLAIN_CACHE_SIZE):
+        self.size = size
+        self._lock = threading.Lock()
+        self._plans = OrderedDict()
+
+    def get(self, key):
+        with self._lock:
+            plan = self._plans.get(key)
+            if plan is not None:
+                self._plans.move_to_end(key)
+            return plan
+
+    def set(self, key, plan):
+        with self._lock:
+            self._plans[key] = plan
+            self._plans.move_to_end(key)
+            while len(self._plans) > self.size:
+                self._plans.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._plans.clear()
+
+
+limiter = RateLimiter(settings.SLOW_QUERY_LOG_LIMIT,
+                      settings.SLOW_QUERY_LOG_PERIOD)
+plans = ExplainCache()
+
+
+def install(sender, connection, **kwargs):
+    """Обработчик connection_created: ставит обёртку на соединение."""
+    if log_slow_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(log_slow_queries)
+
+
+def log_slow_queries(execute, sql, params, many, context):
+    threshold = settings.SLOW_QUERY_MS
+    if not threshold:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    result = execute(sql, params, many, context)
+    duration_ms = (time.perf_counter() - started) * 1000
+    if duration_ms >= threshold:
+        report(sql, params, many, context['connection'], duration_ms)
+    return result
+
+
+def report(sql, params, many, connection, duration_ms):
+    allowed, suppressed = limiter.allow()
+    if not allowed:
+        return
+    view_name = instrumentation.current_view() or '-'
+    plan = '' if many else explain(connection, sql, params)
+    stack = ''.join(traceback.format_list(project_stack()))
+    logger.warning(
+        'Медленный запрос %.1f ms в %s (пропущено до этого: %d)\n%s\n'
+        'План:\n%s\nСтек:\n%s',
+        duration_ms, view_name, suppressed, sql, plan, stack,
+        extra={'duration_ms': duration_ms, 'view_name': view_name,
+               'sql': sql},
+    )
+
+
+def explain(connection, sql, params):
+    if sql.lstrip()[:6].upper() != 'SELECT':
+        return ''
+    key = (connection.alias, sql)
+    plan = plans.get(key)
+    if plan is not None:
+        return plan
+    # Курсор драйвера в обход execute_wrappers и connection.queries:
+    # EXPLAIN не должен попадать в метрики запроса, бюджеты и этот журнал.
+    try:
+        prefix = connection.ops.explain_query_prefix()
+        with connection.wrap_database_errors:
+            cursor = connection.create_cursor()
+            try:
+                cursor.execute(f'{prefix} {sql}', params)
+                rows = cursor.fetchall()
+            finally:
+                cursor.close()
+    except (DatabaseError, NotImplementedError) as error:
+        return f'EXPLAIN недоступен: {error}'
+    plan = '\n'.join(
+        ' '.join(str(column) for column in row) for row in rows)
+    plans.set(key, plan)
+    return plan
+
+
+def project_stack():
+    """Последние кадры стека из кода проекта, без этого модуля."""
+    frames = [
+        frame for frame in traceback.extract_stack()
+        if frame.filename.startswith(settings.BASE_DIR)
+        and 'site-packages' not in frame.filename
+        and frame.filename != __file__
+    ]
+    return frames[-STACK_DEPTH:]
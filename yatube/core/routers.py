@@ -0,0 +1,76 @@
+import random
+import threading
+from contextlib import contextmanager
+from functools import partial, wraps
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+# Кука, которая после записи на REPLICA_PIN_SECONDS переводит чтение
+# клиента на основную базу, пока реплики догоняют её.
+REPLICA_PIN_COOKIE = 'pin_primary'
+
+_local = threading.local()
+
+
+@contextmanager
+def replica_reads():
+    """Внутри блока чтения уходят на одну реплику, выбранную на входе.
+
+    Вложенный блок продолжает внешний: та же реплика, и запись в нём
+    переводит на основную базу весь внешний блок.
+    """
+    if getattr(_local, 'replica', None) is not None:
+        yield
+        return
+    replicas = settings.REPLICA_DATABASES
+    _local.replica = random.choice(replicas) if replicas else DEFAULT_DB_ALIAS
+    _local.wrote = False
+    try:
+        yield
+    finally:
+        _local.replica = None
+        _local.wrote = False
+
+
+def use_replica(view=None, *, pinned=None):
+    """Представление читает с реплик, если клиент недавно не писал.
+
+    pinned(request, *args, **kwargs) может вернуть True, чтобы
+    запрос читал с основной базы, например пока реплики не получили
+    недавнюю запись в показываемые данные.
+    """
+    if view is None:
+        return partial(use_replica, pinned=pinned)
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if (REPLICA_PIN_COOKIE in request.COOKIES
+                or pinned is not None and pinned(request, *args, **kwargs)):
+            return view(request, *args, **kwargs)
+        with replica_reads():
+            return view(request, *args, **kwargs)
+    return wrapper
+
+
+class ReplicaRouter:
+    """Пишет в основную базу, а читает с реплик только внутри
+    replica_reads() и до первой записи в этом блоке."""
+
+    def db_for_read(self, model, **hints):
+        replica = getattr(_local, 'replica', None)
+        if replica is None or getattr(_local, 'wrote', False):
+            return DEFAULT_DB_ALIAS
+        return replica
+
+    def db_for_write(self, model, **hints):
+        if getattr(_local, 'replica', None) is not None:
+            _local.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Реплики получают схему репликацией с основной базы.
+        return db not in settings.REPLICA_DATABASES
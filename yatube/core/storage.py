@@ -0,0 +1,58 @@
+import gzip
+import os
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = ('.css', '.js', '.svg', '.txt', '.html', '.json',
+                           '.xml', '.map', '.ico')
+COMPRESS_MIN_SIZE = 256
+# Сжатый вариант хранится, только если он заметно меньше исходного.
+COMPRESS_MAX_RATIO = 0.95
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+def compressors():
+    yield '.gz', lambda data: gzip.compress(data, compresslevel=9, mtime=0)
+    if brotli is not None:
+        yield '.br', lambda data: brotli.compress(data, quality=11)
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """Статика с хешем содержимого в имени и рядом лежащими .gz и .br
+    (если установлен пакет brotli) для текстовых файлов."""
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        names = set(paths) | set(self.hashed_files.values())
+        for name in sorted(names):
+            for compressed_name in self.compress(name):
+                yield name, compressed_name, True
+
+    def compress(self, name):
+        if not name.endswith(COMPRESSIBLE_EXTENSIONS) or not self.exists(name):
+            return
+        path = self.path(name)
+        with open(path, 'rb') as source:
+            data = source.read()
+        if len(data) < COMPRESS_MIN_SIZE:
+            return
+        for suffix, compress in compressors():
+            compressed = compress(data)
+            if len(compressed) > len(data) * COMPRESS_MAX_RATIO:
+                continue
+            with open(path + suffix, 'wb') as output:
+                output.write(compressed)
+            yield name + suffix
+
+
+def compressed_variants(path):
+    """Сжатые варианты файла: кодировка -> путь, по убыванию выгоды."""
+    return {encoding: path + suffix for encoding, suffix in ENCODINGS
+            if os.path.isfile(path + suffix)}
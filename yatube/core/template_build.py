@@ -0,0 +1,98 @@
+import hashlib
+import os
+import re
+
+# Только include с именем-литералом, без with и only: такой include
+# рендерит шаблон в том же контексте, и его можно заменить текстом.
+INCLUDE_RE = re.compile(r'{%\s*include\s+(["\'])(?P<name>[^"\']+)\1\s*%}')
+# Шаблоны с наследованием и блоками встраивать нельзя.
+NOT_INLINABLE_RE = re.compile(r'{%\s*(extends|block)\s')
+MAX_DEPTH = 10
+# Хеш исходных шаблонов, из которых собран каталог.
+DIGEST_FILE = '.source-digest'
+
+
+def find_template(name, dirs):
+    for directory in dirs:
+        path = os.path.join(directory, name)
+        if os.path.isfile(path):
+            return path
+    return None
+
+
+def read_template(path):
+    with open(path, encoding='utf-8') as source:
+        return source.read()
+
+
+def inline_includes(source, dirs, depth=0):
+    """Подставляет текст статических include вместо самих тегов."""
+    if depth >= MAX_DEPTH:
+        return source
+
+    def replace(match):
+        path = find_template(match.group('name'), dirs)
+        if path is None:
+            return match.group(0)
+        included = read_template(path)
+        if NOT_INLINABLE_RE.search(included):
+            return match.group(0)
+        return inline_includes(included, dirs, depth + 1)
+
+    return INCLUDE_RE.sub(replace, source)
+
+
+def template_names(source_dir):
+    names = []
+    for root, _, files in os.walk(source_dir):
+        names.extend(
+            os.path.relpath(os.path.join(root, filename), source_dir)
+            for filename in files if filename.endswith('.html')
+        )
+    return sorted(names)
+
+
+def source_digest(source_dirs):
+    """Хеш имён и текста всех шаблонов source_dirs."""
+    digest = hashlib.md5()
+    for source_dir in source_dirs:
+        for name in template_names(source_dir):
+            digest.update(name.encode())
+            digest.update(
+                read_template(os.path.join(source_dir, name)).encode())
+    return digest.hexdigest()
+
+
+def is_fresh(target_dir, source_dirs):
+    """Каталог target_dir собран из текущих шаблонов source_dirs."""
+    try:
+        with open(os.path.join(target_dir, DIGEST_FILE)) as digest:
+            return digest.read() == source_digest(source_dirs)
+    except OSError:
+        return False
+
+
+def build_templates(source_dirs, target_dir):
+    """Копирует шаблоны из source_dirs в target_dir со встроенными
+    include и возвращает список собранных имён.
+
+    Шаблоны, которых больше нет среди исходных, удаляются из target_dir,
+    а рядом записывается хеш исходных для is_fresh.
+    """
+    built = []
+    for source_dir in source_dirs:
+        for name in template_names(source_dir):
+            if name in built:
+                continue
+            target = os.path.join(target_dir, name)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with open(target, 'w', encoding='utf-8') as output:
+                output.write(inline_includes(
+                    read_template(os.path.join(source_dir, name)),
+                    source_dirs))
+            built.append(name)
+    for name in set(template_names(target_dir)) - set(built):
+        os.remove(os.path.join(target_dir, name))
+    with open(os.path.join(target_dir, DIGEST_FILE), 'w') as digest:
+        digest.write(source_digest(source_dirs))
+    return sorted(built)
@@ -0,0 +1,164 @@
+import statistics
+import time
+from collections import defaultdict, namedtuple
+from contextlib import ContextDecorator
+from unittest import mock
+
+import pytest
+from django.db import connection
+from django.template.backends.django import Template
+from django.test.client import Client
+from django.test.utils import CaptureQueriesContext
+
+Budget = namedtuple('Budget', ('queries', 'render_ms', 'bytes'))
+Measurement = namedtuple(
+    'Measurement', ('view_name', 'path', 'queries', 'render_ms', 'bytes'))
+
+# Бюджеты на один запрос при прогретых счётчиках постов и сессиях
+# cached_db; запас в один запрос — на чтение пользователя, если его нет
+# в кеше users.caching или кеш отключён (USER_CACHE_TIMEOUT = 0). Время
+# рендера сравнивается по медиане запросов к представлению, с запасом
+# в пару раз на медленные машины CI.
+FEED_RENDER_MS = 30
+RENDER_MS = 20
+# Сколько раз тесты запрашивают каждую страницу под within_budgets.
+BUDGET_REPEAT = 5
+FEED_BYTES = 32 * 1024
+PAGE_BYTES = 16 * 1024
+BUDGETS = {
+    'posts:index': Budget(3, FEED_RENDER_MS, FEED_BYTES),
+    'posts:group_list': Budget(4, FEED_RENDER_MS, FEED_BYTES),
+    'posts:profile': Budget(4, FEED_RENDER_MS, FEED_BYTES),
+    'posts:post_detail': Budget(4, RENDER_MS, PAGE_BYTES),
+    'posts:post_create': Budget(2, RENDER_MS, PAGE_BYTES),
+    'posts:post_edit': Budget(4, RENDER_MS, PAGE_BYTES),
+    'posts:search': Budget(3, FEED_RENDER_MS, FEED_BYTES),
+    'api:index': Budget(1, 0, FEED_BYTES),
+    'api:group_list': Budget(2, 0, FEED_BYTES),
+    'api:profile': Budget(2, 0, FEED_BYTES),
+    'api:post_detail': Budget(1, 0, PAGE_BYTES),
+    'users:signup': Budget(1, RENDER_MS, PAGE_BYTES),
+    'users:login': Budget(1, RENDER_MS, PAGE_BYTES),
+    'users:logout': Budget(3, RENDER_MS, PAGE_BYTES),
+    'users:password_change': Budget(1, RENDER_MS, PAGE_BYTES),
+    'users:password_change_done': Budget(1, RENDER_MS, PAGE_BYTES),
+    'users:password_reset_form': Budget(1, RENDER_MS, PAGE_BYTES),
+    'users:password_reset_done': Budget(1, RENDER_MS, PAGE_BYTES),
+    'users:password_reset_confirm': Budget(2, RENDER_MS, PAGE_BYTES),
+    'users:password_reset_complete': Budget(1, RENDER_MS, PAGE_BYTES),
+    'about:author': Budget(1, RENDER_MS, PAGE_BYTES),
+    'about:tech': Budget(1, RENDER_MS, PAGE_BYTES),
+}
+
+
+class within_budgets(ContextDecorator):
+    """Проверяет каждый запрос тестового клиента по бюджету его URL.
+
+    Работает как декоратор теста и как контекстный менеджер; запросы
+    к URL без бюджета только записываются в measurements. Время рендера
+    проверяется по медиане всех запросов к представлению, поэтому
+    страницы стоит запрашивать несколько раз: первый рендер загружает
+    шаблоны, а единичные паузы машины не должны ронять тест. Бюджет
+    render_ms = 0 означает, что время рендера не проверяется. В тестах
+    pytest то же даёт фикстура budgets.
+    """
+
+    def __init__(self, budgets=None):
+        self.budgets = BUDGETS if budgets is None else budgets
+
+    def __enter__(self):
+        self.measurements = []
+        self._render_ms = 0
+        self._render_depth = 0
+        self._patches = [
+            mock.patch.object(Client, 'request', self._wrap_request(
+                Client.request)),
+            mock.patch.object(Template, 'render', self._wrap_render(
+                Template.render)),
+        ]
+        for patch in self._patches:
+            patch.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        for patch in reversed(self._patches):
+            patch.stop()
+        if exc_type is None:
+            self.verify()
+        return False
+
+    def _wrap_request(self, request):
+        checker = self
+
+        def wrapper(client, **kwargs):
+            checker._render_ms = 0
+            with CaptureQueriesContext(connection) as queries:
+                response = request(client, **kwargs)
+                if response.streaming:
+                    # Потоковый ответ читает базу при выдаче тела.
+                    content = b''.join(response.streaming_content)
+                    response.streaming_content = [content]
+            match = getattr(response, 'resolver_match', None)
+            checker.measurements.append(Measurement(
+                view_name=match.view_name if match else None,
+                path=kwargs.get('PATH_INFO'),
+                queries=len(queries),
+                render_ms=checker._render_ms,
+                bytes=len(content if response.streaming
+                          else response.content),
+            ))
+            return response
+        return wrapper
+
+    def _wrap_render(self, render):
+        checker = self
+
+        def wrapper(template, *args, **kwargs):
+            # Вложенные рендеры (виджеты форм) уже входят во внешний.
+            checker._render_depth += 1
+            started = time.perf_counter()
+            try:
+                return render(template, *args, **kwargs)
+            finally:
+                checker._render_depth -= 1
+                if not checker._render_depth:
+                    checker._render_ms += (
+                        time.perf_counter() - started) * 1000
+        return wrapper
+
+    def violations(self):
+        render_ms = defaultdict(list)
+        for measurement in self.measurements:
+            budget = self.budgets.get(measurement.view_name)
+            if budget is None:
+                continue
+            if measurement.queries > budget.queries:
+                yield (f'{measurement.view_name} ({measurement.path}): '
+                       f'{measurement.queries} SQL > {budget.queries}')
+            if measurement.bytes > budget.bytes:
+                yield (f'{measurement.view_name} ({measurement.path}): '
+                       f'{measurement.bytes} B > {budget.bytes} B')
+            render_ms[measurement.view_name].append(measurement.render_ms)
+        for view_name, timings in render_ms.items():
+            budget = self.budgets[view_name]
+            median = statistics.median(timings)
+            if budget.render_ms and median > budget.render_ms:
+                yield (f'{view_name}: медиана рендера {median:.0f} ms '
+                       f'> {budget.render_ms} ms')
+
+    def verify(self):
+        violations = list(self.violations())
+        if violations:
+            raise AssertionError(
+                'Превышен бюджет:\n' + '\n'.join(violations))
+
+
+@pytest.fixture
+def budgets():
+    """Фикстура pytest: тест целиком идёт под within_budgets().
+
+    Подключается строкой pytest_plugins = ['core.tests.budgets'] в модуле
+    тестов или conftest.py.
+    """
+    with within_budgets() as checker:
+        yield checker
@@ -0,0 +1,126 @@
+import asyncio
+
+from django.core.wsgi import get_wsgi_application
+from django.test import SimpleTestCase
+from django.urls import reverse
+
+from core.asgi import WsgiToAsgi, build_environ
+
+
+class WsgiToAsgiTests(SimpleTestCase):
+
+    def setUp(self):
+        self.application = WsgiToAsgi(get_wsgi_application(), threads=2)
+        self.addCleanup(self.application.executor.shutdown)
+
+    def request(self, path, method='GET', body=b'', headers=()):
+        scope = {
+            'type': 'http',
+            'method': method,
+            'path': path,
+            'query_string': b'',
+            'headers': list(headers),
+            'server': ('testserver', 80),
+            'client': ('127.0.0.1', 50000),
+        }
+        chunks = [body[:1], body[1:]]
+        sent = []
+
+        async def receive():
+            chunk = chunks.pop(0)
+            return {'type': 'http.request', 'body': chunk,
+                    'more_body': bool(chunks)}
+
+        async def send(message):
+            sent.append(message)
+
+        asyncio.run(self.application(scope, receive, send))
+        return sent
+
+    def test_page_is_served_over_asgi(self):
+        """Страница отдаётся через ASGI тем же приложением Django."""
+        sent = self.request(reverse('about:author'))
+        self.assertEqual(sent[0]['type'], 'http.response.start')
+        self.assertEqual(sent[0]['status'], 200)
+        self.assertIn((b'content-type', b'text/html; charset=utf-8'),
+                      sent[0]['headers'])
+        body = b''.join(message.get('body', b'') for message in sent[1:])
+        self.assertIn('Об авторе'.encode(), body)
+        self.assertFalse(sent[-1].get('more_body'))
+
+    def test_slow_client_does_not_hold_thread(self):
+        """Пока медленный клиент принимает обычный ответ, единственный
+        поток пула обслуживает следующий запрос."""
+        application = WsgiToAsgi(get_wsgi_application(), threads=1)
+        self.addCleanup(application.executor.shutdown)
+        scope = {
+            'type': 'http',
+            'method': 'GET',
+            'path': reverse('about:author'),
+            'query_string': b'',
+            'headers': [],
+        }
+
+        async def receive():
+            return {'type': 'http.request', 'body': b''}
+
+        async def main():
+            second_done = asyncio.Event()
+            second = []
+
+            async def slow_send(message):
+                await second_done.wait()
+
+            async def send(message):
+                second.append(message)
+                if (message['type'] == 'http.response.body'
+                        and not message.get('more_body')):
+                    second_done.set()
+
+            await asyncio.wait_for(asyncio.gather(
+                application(scope, receive, slow_send),
+                application(scope, receive, send),
+            ), timeout=10)
+            return second
+
+        second = asyncio.run(main())
+        self.assertEqual(second[0]['status'], 200)
+
+    def test_streaming_response_is_sent_by_chunks(self):
+        """Потоковый ответ уходит клиенту по частям."""
+        def streaming(environ, start_response):
+            start_response('200 OK', [('Content-Type', 'text/plain')])
+            yield b'first'
+            yield b''
+            yield b'second'
+
+        self.application.wsgi_application = streaming
+        sent = self.request('/')
+        self.assertEqual(sent[0]['status'], 200)
+        self.assertEqual([message['body'] for message in sent[1:]],
+                         [b'first', b'second', b''])
+
+    def test_unknown_page_returns_404(self):
+        """Неизвестный адрес получает 404."""
+        sent = self.request('/no-such-page/')
+        self.assertEqual(sent[0]['status'], 404)
+
+    def test_environ_is_built_from_scope(self):
+        """Заголовки, тело и адрес клиента попадают в WSGI-окружение."""
+        environ = build_environ({
+            'method': 'POST',
+            'path': '/поиск/',
+            'query_string': b'q=1',
+            'headers': [(b'content-type', b'text/plain'),
+                        (b'x-forwarded-for', b'10.0.0.1'),
+                        (b'x-forwarded-for', b'10.0.0.2')],
+            'client': ('127.0.0.1', 50000),
+        }, b'text')
+        self.assertEqual(environ['CONTENT_TYPE'], 'text/plain')
+        self.assertEqual(environ['HTTP_X_FORWARDED_FOR'],
+                         '10.0.0.1,10.0.0.2')
+        self.assertEqual(environ['QUERY_STRING'], 'q=1')
+        self.assertEqual(environ['PATH_INFO'].encode('latin1').decode(),
+                         '/поиск/')
+        self.assertEqual(environ['wsgi.input'].read(), b'text')
+        self.assertEqual(environ['REMOTE_ADDR'], '127.0.0.1')
@@ -0,0 +1,89 @@
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from about import urls as about_urls
+from core.tests.budgets import BUDGET_REPEAT, BUDGETS, within_budgets
+from posts import api_urls, counters
+from posts import urls as posts_urls
+from posts.models import Group, Post, User
+from posts.tests.test_views import POST_TEXT
+from users import urls as users_urls
+
+TESTS_RECORDS_COUNT = 20
+
+
+class BudgetsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='AutoTestUser')
+        cls.group = Group.objects.create(
+            title='Test group',
+            slug='test_slug',
+            description='This is a test group!',
+        )
+        Post.objects.bulk_create([
+            Post(
+                author=cls.user,
+                text=POST_TEXT.format(num + 1),
+                group=cls.group
+            ) for num in range(TESTS_RECORDS_COUNT)
+        ])
+        cls.post = Post.objects.first()
+
+    def setUp(self):
+        counters.rebuild()
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def budget_urls(self):
+        return [
+            reverse('posts:index'),
+            reverse('posts:group_list', args=(self.group.slug,)),
+            reverse('posts:profile', args=(self.user.username,)),
+            reverse('posts:post_detail', args=(self.post.id,)),
+            reverse('posts:post_create'),
+            reverse('posts:post_edit', args=(self.post.id,)),
+            reverse('posts:search') + '?q=Тестовый',
+            reverse('api:index'),
+            reverse('api:group_list', args=(self.group.slug,)),
+            reverse('api:profile', args=(self.user.username,)),
+            reverse('api:post_detail', args=(self.post.id,)),
+            reverse('users:signup'),
+            reverse('users:login'),
+            reverse('users:password_change'),
+            reverse('users:password_change_done'),
+            reverse('users:password_reset_form'),
+            reverse('users:password_reset_done'),
+            reverse('users:password_reset_confirm',
+                    args=('MQ', 'set-password')),
+            reverse('users:password_reset_complete'),
+            reverse('about:author'),
+            reverse('about:tech'),
+            reverse('users:logout'),
+        ]
+
+    def test_every_view_has_budget(self):
+        """У каждого именованного URL приложений есть бюджет."""
+        for module in (posts_urls, api_urls, users_urls, about_urls):
+            for pattern in module.urlpatterns:
+                view_name = f'{module.app_name}:{pattern.name}'
+                with self.subTest(view_name=view_name):
+                    self.assertIn(view_name, BUDGETS)
+
+    def test_pages_fit_budgets(self):
+        """Страницы гостя и авторизованного пользователя укладываются
+        в бюджеты."""
+        for name, client in (('guest', self.guest_client),
+                             ('user', self.authorized_client)):
+            with self.subTest(client=name):
+                with within_budgets() as checker:
+                    for url in self.budget_urls():
+                        for _ in range(BUDGET_REPEAT):
+                            client.get(url)
+                            if client is self.authorized_client:
+                                # logout завершает сессию.
+                                client.force_login(self.user)
+                self.assertEqual(len(checker.measurements),
+                                 len(self.budget_urls()) * BUDGET_REPEAT)
@@ -0,0 +1,142 @@
+import gzip
+import itertools
+from unittest import mock
+
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import (Client, RequestFactory, SimpleTestCase, TestCase,
+                         override_settings)
+from django.urls import reverse
+
+from core import compression
+from core.instrumentation import stats
+from core.middleware import (STREAM_FLUSH_SECONDS, STREAM_FLUSH_SIZE,
+                             CompressionMiddleware)
+from posts import counters
+from posts.models import Group, Post, User
+from posts.tests.test_views import POST_TEXT
+
+TESTS_RECORDS_COUNT = 13
+
+
+class CompressionMiddlewareTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='AutoTestUser')
+        cls.group = Group.objects.create(
+            title='Test group',
+            slug='test_slug',
+            description='This is a test group!',
+        )
+        Post.objects.bulk_create([
+            Post(
+                author=cls.user,
+                text=POST_TEXT.format(num + 1),
+                group=cls.group
+            ) for num in range(TESTS_RECORDS_COUNT)
+        ])
+
+    def setUp(self):
+        counters.rebuild()
+        self.guest_client = Client()
+
+    def test_page_is_gzipped_when_accepted(self):
+        """Страница сжимается gzip, если клиент его принимает."""
+        url = reverse('posts:index')
+        plain = self.guest_client.get(url)
+        response = self.guest_client.get(
+            url, HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertLess(len(response.content), len(plain.content))
+        self.assertEqual(gzip.decompress(response.content), plain.content)
+
+    def test_identity_without_accepted_encoding(self):
+        """Без поддержки сжатия или при q=0 ответ не сжимается."""
+        for header in ('', 'identity', 'gzip;q=0'):
+            with self.subTest(header=header):
+                response = self.guest_client.get(
+                    reverse('posts:index'), HTTP_ACCEPT_ENCODING=header)
+                self.assertFalse(response.has_header('Content-Encoding'))
+
+    def test_streaming_response_is_compressed_incrementally(self):
+        """Потоковый ответ сжимается по частям, без сборки тела."""
+        url = reverse('api:index') + '?limit=13'
+        plain = b''.join(self.guest_client.get(url).streaming_content)
+        response = self.guest_client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertFalse(response.has_header('Content-Length'))
+        content = b''.join(response.streaming_content)
+        self.assertEqual(gzip.decompress(content), plain)
+
+    @override_settings(INSTRUMENTATION_SAMPLE_RATE=1)
+    def test_compression_cost_is_instrumented(self):
+        """Время сжатия видно в Server-Timing и в замерах."""
+        stats.clear()
+        response = self.guest_client.get(
+            reverse('posts:index'), HTTP_ACCEPT_ENCODING='gzip')
+        self.assertIn('compress;dur=', response['Server-Timing'])
+        index = stats.summary()['posts:index']
+        self.assertGreater(index['compress_ms']['p50'], 0)
+        self.assertEqual(index['bytes']['p50'], len(response.content))
+
+
+class CompressionRulesTests(SimpleTestCase):
+
+    def compress(self, response, accept='gzip'):
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING=accept)
+        return CompressionMiddleware(lambda request: response)(request)
+
+    def test_tiny_and_binary_responses_are_not_compressed(self):
+        """Маленькие, двоичные и уже сжатые ответы отдаются как есть."""
+        encoded = HttpResponse('x' * 1000)
+        encoded['Content-Encoding'] = 'br'
+        for response in (
+            HttpResponse('ok'),
+            HttpResponse(b'\x89PNG' * 500, content_type='image/png'),
+            encoded,
+        ):
+            with self.subTest(content_type=response['Content-Type']):
+                content = response.content
+                compressed = self.compress(response)
+                self.assertEqual(compressed.content, content)
+        self.assertEqual(encoded['Content-Encoding'], 'br')
+
+    def stream(self, lines):
+        response = self.compress(StreamingHttpResponse(
+            iter(lines), content_type='application/x-ndjson'))
+        chunks = [chunk for chunk in response.streaming_content if chunk]
+        self.assertEqual(gzip.decompress(b''.join(chunks)), b''.join(lines))
+        return chunks
+
+    def test_stream_is_flushed_by_size(self):
+        """Поток сбрасывается порциями по STREAM_FLUSH_SIZE, а не после
+        каждой части."""
+        line = POST_TEXT.format(1).encode() + b'\n'
+        lines = [line] * (3 * STREAM_FLUSH_SIZE // len(line))
+        self.assertLessEqual(len(self.stream(lines)), 4)
+        self.assertLessEqual(len(self.stream(lines[:10])), 2)
+
+    def test_slow_stream_is_flushed_by_time(self):
+        """Медленный поток сбрасывается раз в STREAM_FLUSH_SECONDS, даже
+        если порция не набралась."""
+        clock = itertools.count(step=STREAM_FLUSH_SECONDS)
+        lines = [POST_TEXT.format(num).encode() for num in range(3)]
+        with mock.patch('core.middleware.time.monotonic',
+                        lambda: next(clock)):
+            self.assertEqual(len(self.stream(lines)), 4)
+
+    def test_strong_etag_becomes_weak(self):
+        """Сильный ETag сжатого ответа становится слабым."""
+        response = HttpResponse('x' * 1000)
+        response['ETag'] = '"abc"'
+        self.assertEqual(self.compress(response)['ETag'], 'W/"abc"')
+
+    def test_negotiate(self):
+        """Выбирается br при наличии brotli, иначе gzip."""
+        self.assertEqual(compression.negotiate('gzip;q=0.5, br'),
+                         'br' if compression.brotli else 'gzip')
+        self.assertEqual(compression.negotiate('deflate, gzip'), 'gzip')
+        self.assertIsNone(compression.negotiate('br;q=0, gzip;q=0'))
+        self.assertIsNone(compression.negotiate(''))
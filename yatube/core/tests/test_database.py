@@ -0,0 +1,34 @@
+import os
+import tempfile
+from unittest import skipUnless
+
+from django.conf import settings
+from django.db import connection
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from django.test import SimpleTestCase
+
+
+@skipUnless(connection.vendor == 'sqlite', 'Прагмы только для SQLite')
+class SQLitePragmasTests(SimpleTestCase):
+
+    def test_new_connection_gets_pragmas(self):
+        """Новое соединение с файлом SQLite получает WAL и прагмы."""
+        with tempfile.TemporaryDirectory() as directory:
+            settings_dict = dict(
+                connection.settings_dict,
+                NAME=os.path.join(directory, 'pragmas.sqlite3'))
+            wrapper = DatabaseWrapper(settings_dict, alias='pragmas')
+            try:
+                with wrapper.cursor() as cursor:
+                    for pragma, expected in (
+                        ('journal_mode', 'wal'),
+                        ('synchronous', 1),
+                        ('busy_timeout',
+                         settings.SQLITE_PRAGMAS['busy_timeout']),
+                        ('cache_size', settings.SQLITE_PRAGMAS['cache_size']),
+                    ):
+                        with self.subTest(pragma=pragma):
+                            cursor.execute(f'PRAGMA {pragma}')
+                            self.assertEqual(cursor.fetchone()[0], expected)
+            finally:
+                wrapper.close()
@@ -0,0 +1,130 @@
+import json
+
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test import (Client, TestCase, TransactionTestCase,
+                         override_settings)
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.instrumentation import percentile, stats
+from core.tests.test_routers import TEST_REPLICA
+from posts import counters
+from posts.models import Group, Post, User
+from posts.tests.test_views import POST_TEXT
+
+TESTS_RECORDS_COUNT = 3
+
+
+@override_settings(INSTRUMENTATION_SAMPLE_RATE=1)
+class InstrumentationMiddlewareTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='AutoTestUser')
+        cls.group = Group.objects.create(
+            title='Test group',
+            slug='test_slug',
+            description='This is a test group!',
+        )
+        Post.objects.bulk_create([
+            Post(
+                author=cls.user,
+                text=POST_TEXT.format(num + 1),
+                group=cls.group
+            ) for num in range(TESTS_RECORDS_COUNT)
+        ])
+
+    def setUp(self):
+        stats.clear()
+        counters.rebuild()
+        self.guest_client = Client()
+
+    def test_response_has_server_timing(self):
+        """Ответ несёт Server-Timing с SQL, шаблонами и представлением."""
+        with self.assertNumQueries(2):
+            response = self.guest_client.get(reverse('posts:index'))
+        timing = response['Server-Timing']
+        for name in ('total;dur=', 'view;dur=', 'tpl;dur='):
+            with self.subTest(name=name):
+                self.assertIn(name, timing)
+        self.assertIn('desc="2 queries"', timing)
+
+    def test_requests_are_aggregated_by_view_name(self):
+        """Замеры копятся по имени представления."""
+        for _ in range(3):
+            self.guest_client.get(reverse('posts:index'))
+        self.guest_client.get(
+            reverse('posts:group_list', args=(self.group.slug,)))
+        summary = stats.summary()
+        self.assertEqual(summary['posts:index']['count'], 3)
+        self.assertEqual(summary['posts:group_list']['count'], 1)
+        index = summary['posts:index']
+        self.assertEqual(index['sql_count']['p50'], 2)
+        self.assertGreater(index['template_ms']['p95'], 0)
+        self.assertGreaterEqual(index['total_ms']['p99'],
+                                index['view_ms']['p99'])
+        self.assertGreater(index['bytes']['p50'], 0)
+
+    def test_streaming_response_is_measured_after_consumption(self):
+        """Размер и SQL потокового ответа учитываются при его выдаче."""
+        response = self.guest_client.get(reverse('api:index'))
+        self.assertNotIn('api:index', stats.summary())
+        content = b''.join(response.streaming_content)
+        measured = stats.summary()['api:index']
+        self.assertEqual(measured['bytes']['p50'], len(content))
+        self.assertEqual(measured['sql_count']['p50'], 1)
+
+    @override_settings(INSTRUMENTATION_SAMPLE_RATE=0)
+    def test_sampling_off_skips_instrumentation(self):
+        """При нулевой доле выборки запросы не замеряются."""
+        response = self.guest_client.get(reverse('posts:index'))
+        self.assertFalse(response.has_header('Server-Timing'))
+        self.assertEqual(stats.summary(), {})
+
+    def test_metrics_endpoint_is_for_staff_only(self):
+        """Перцентили видны только сотрудникам."""
+        self.guest_client.get(reverse('posts:index'))
+        response = self.guest_client.get(reverse('core:metrics'))
+        self.assertEqual(response.status_code, 302)
+        staff = User.objects.create_user(username='Staff', is_staff=True)
+        staff_client = Client()
+        staff_client.force_login(staff)
+        response = staff_client.get(reverse('core:metrics'))
+        self.assertEqual(response.status_code, 200)
+        summary = json.loads(response.content)
+        self.assertEqual(
+            set(summary['posts:index']['total_ms']), {'p50', 'p95', 'p99'})
+
+    def test_percentile(self):
+        """Перцентиль считается по ближайшему рангу."""
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 95), 95)
+        self.assertEqual(percentile([7], 99), 7)
+        self.assertIsNone(percentile([], 50))
+
+
+@override_settings(INSTRUMENTATION_SAMPLE_RATE=1,
+                   REPLICA_DATABASES=[TEST_REPLICA])
+class ReplicaInstrumentationTests(TransactionTestCase):
+    databases = {DEFAULT_DB_ALIAS, TEST_REPLICA}
+
+    def setUp(self):
+        user = User.objects.create_user(username='AutoTestUser')
+        Post.objects.create(author=user, text=POST_TEXT.format(1))
+        counters.rebuild()
+        cache.clear()
+        self.addCleanup(cache.clear)
+        stats.clear()
+
+    def test_replica_queries_are_measured(self):
+        """SQL, ушедший на реплику, тоже попадает в замеры."""
+        with CaptureQueriesContext(connections[DEFAULT_DB_ALIAS]) as primary:
+            with CaptureQueriesContext(connections[TEST_REPLICA]) as replica:
+                response = Client().get(reverse('posts:index'))
+        self.assertGreater(len(replica), 0)
+        total = len(primary) + len(replica)
+        self.assertIn(f'desc="{total} queries"', response['Server-Timing'])
+        self.assertEqual(
+            stats.summary()['posts:index']['sql_count']['p50'], total)
@@ -0,0 +1,94 @@
+from unittest import mock
+
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core import querylog
+from posts.models import Group, Post, User
+from posts.tests.test_views import POST_TEXT
+
+ALWAYS_SLOW_MS = 1e-6
+
+
+class SlowQueryLogTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='AutoTestUser')
+        cls.group = Group.objects.create(
+            title='Test group',
+            slug='test_slug',
+            description='This is a test group!',
+        )
+        Post.objects.create(
+            author=cls.user, text=POST_TEXT.format(1), group=cls.group)
+
+    def setUp(self):
+        querylog.plans.clear()
+        self.guest_client = Client()
+        limiter = mock.patch.object(
+            querylog, 'limiter', querylog.RateLimiter(100, 60))
+        limiter.start()
+        self.addCleanup(limiter.stop)
+
+    @override_settings(SLOW_QUERY_MS=ALWAYS_SLOW_MS)
+    def test_slow_query_is_logged_with_view_plan_and_stack(self):
+        """Медленный запрос пишется с представлением, планом и стеком."""
+        with self.assertLogs('core.querylog', 'WARNING') as logs:
+            self.guest_client.get(
+                reverse('posts:group_list', args=(self.group.slug,)))
+        record = next(record for record in logs.records
+                      if 'posts_post' in record.sql)
+        self.assertEqual(record.view_name, 'posts:group_list')
+        message = record.getMessage()
+        self.assertIn('План:\n', message)
+        self.assertRegex(message, r'(SCAN|SEARCH)')
+        self.assertIn('posts/views.py', message)
+
+    @override_settings(SLOW_QUERY_MS=ALWAYS_SLOW_MS)
+    def test_explain_bypasses_instrumented_cursor(self):
+        """EXPLAIN не проходит через execute_wrappers и не попадает
+        в connection.queries."""
+        executed = []
+
+        def record(execute, sql, params, many, context):
+            executed.append(sql)
+            return execute(sql, params, many, context)
+
+        with self.assertLogs('core.querylog', 'WARNING') as logs:
+            with CaptureQueriesContext(connection) as queries:
+                with connection.execute_wrapper(record):
+                    list(Post.objects.all())
+        self.assertIn('План:\n', logs.records[0].getMessage())
+        self.assertEqual(len(executed), 1)
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('EXPLAIN', queries[0]['sql'])
+
+    @override_settings(SLOW_QUERY_MS=ALWAYS_SLOW_MS)
+    def test_log_is_rate_limited(self):
+        """Сверх лимита записи не пишутся, но учитываются."""
+        with mock.patch.object(
+                querylog, 'limiter', querylog.RateLimiter(2, 60)):
+            with self.assertLogs('core.querylog', 'WARNING') as logs:
+                for _ in range(5):
+                    list(Post.objects.all())
+            self.assertEqual(len(logs.records), 2)
+            self.assertEqual(querylog.limiter.suppressed, 3)
+
+    @override_settings(SLOW_QUERY_MS=0)
+    def test_zero_threshold_disables_log(self):
+        """Нулевой порог отключает журнал."""
+        with mock.patch.object(querylog.logger, 'warning') as warning:
+            self.guest_client.get(reverse('posts:index'))
+        warning.assert_not_called()
+
+    def test_rate_limiter_reports_suppressed_events(self):
+        """Следующая разрешённая запись сообщает число пропущенных."""
+        limiter = querylog.RateLimiter(1, 60)
+        self.assertEqual(limiter.allow(), (True, 0))
+        self.assertEqual(limiter.allow(), (False, 0))
+        self.assertEqual(limiter.allow(), (False, 0))
+        limiter._window_started -= 60
+        self.assertEqual(limiter.allow(), (True, 2))
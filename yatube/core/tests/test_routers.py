@@ -0,0 +1,158 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test import (Client, SimpleTestCase, TransactionTestCase,
+                         override_settings)
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.routers import REPLICA_PIN_COOKIE, ReplicaRouter, replica_reads
+from posts import counters
+from posts.models import Group, Post, User
+from posts.tests.test_views import POST_TEXT
+
+REPLICAS = ['replica1', 'replica2']
+
+# Настоящее соединение-реплика: в тестах оно смотрит в тестовую основную
+# базу, как реплики из YATUBE_DB_REPLICAS. Отдельное соединение видит
+# только зафиксированные данные, поэтому тесты с ним — TransactionTestCase.
+TEST_REPLICA = 'test_replica'
+connections.databases.setdefault(TEST_REPLICA, dict(
+    settings.DATABASES[DEFAULT_DB_ALIAS], TEST={'MIRROR': DEFAULT_DB_ALIAS}))
+
+
+@override_settings(REPLICA_DATABASES=REPLICAS)
+class ReplicaRouterTests(SimpleTestCase):
+    def setUp(self):
+        self.router = ReplicaRouter()
+
+    def test_reads_go_to_replicas_only_inside_replica_reads(self):
+        """Чтение уходит на реплику внутри replica_reads() до первой
+        записи в блоке."""
+        self.assertEqual(self.router.db_for_read(Post), DEFAULT_DB_ALIAS)
+        with replica_reads():
+            self.assertIn(self.router.db_for_read(Post), REPLICAS)
+            self.assertEqual(self.router.db_for_write(Post), DEFAULT_DB_ALIAS)
+            self.assertEqual(self.router.db_for_read(Post), DEFAULT_DB_ALIAS)
+        self.assertEqual(self.router.db_for_read(Post), DEFAULT_DB_ALIAS)
+        with replica_reads():
+            self.assertIn(self.router.db_for_read(Post), REPLICAS)
+
+    def test_block_reads_from_one_replica(self):
+        """Все чтения блока, в том числе вложенного, идут на одну
+        реплику."""
+        for _ in range(10):
+            with replica_reads():
+                reads = {self.router.db_for_read(Post) for _ in range(10)}
+                with replica_reads():
+                    reads.add(self.router.db_for_read(Group))
+            self.assertEqual(len(reads), 1)
+
+    def test_write_in_nested_block_pins_outer_block(self):
+        """Запись во вложенном блоке переводит на основную базу и внешний
+        блок до его конца."""
+        with replica_reads():
+            with replica_reads():
+                self.router.db_for_write(Post)
+            self.assertEqual(self.router.db_for_read(Post), DEFAULT_DB_ALIAS)
+        with replica_reads():
+            self.assertIn(self.router.db_for_read(Post), REPLICAS)
+
+
+@override_settings(REPLICA_DATABASES=[TEST_REPLICA])
+class ReplicaReadsTests(TransactionTestCase):
+    databases = {DEFAULT_DB_ALIAS, TEST_REPLICA}
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='AutoTestUser')
+        self.group = Group.objects.create(
+            title='Test group',
+            slug='test_slug',
+            description='This is a test group!',
+        )
+        self.post = Post.objects.create(
+            author=self.user, text=POST_TEXT.format(1), group=self.group)
+        counters.rebuild()
+        # Метки недавно изменённых лент от создания данных выше.
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def get(self, client, url, **kwargs):
+        """Запрос и SQL, выполненный им на основной базе и на реплике."""
+        with CaptureQueriesContext(connections[DEFAULT_DB_ALIAS]) as primary:
+            with CaptureQueriesContext(connections[TEST_REPLICA]) as replica:
+                response = client.get(url, **kwargs)
+        return (response, [query['sql'] for query in primary],
+                [query['sql'] for query in replica])
+
+    def test_feed_views_read_from_replica(self):
+        """Ленты и страница поста читают посты с реплики."""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', args=(self.group.slug,)),
+            reverse('posts:profile', args=(self.user.username,)),
+            reverse('posts:post_detail', args=(self.post.pk,)),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response, primary, replica = self.get(
+                    self.authorized_client, url)
+                self.assertContains(response, self.post.text)
+                self.assertTrue(any('posts_post' in sql for sql in replica))
+                self.assertFalse(any('posts_post' in sql for sql in primary))
+
+    def test_write_views_use_primary(self):
+        """Создание и правка поста и регистрация работают с основной базой."""
+        with CaptureQueriesContext(connections[TEST_REPLICA]) as replica:
+            self.authorized_client.get(reverse('posts:post_create'))
+            self.authorized_client.get(
+                reverse('posts:post_edit', args=(self.post.pk,)))
+            Client().post(reverse('users:signup'), {
+                'username': 'NewUser',
+                'password1': 'Yatube-test-password-1',
+                'password2': 'Yatube-test-password-1',
+            })
+        self.assertEqual(len(replica), 0)
+
+    def test_author_reads_primary_right_after_posting(self):
+        """После публикации автор читает свой профиль с основной базы."""
+        response = self.authorized_client.post(
+            reverse('posts:post_create'), {'text': 'Свежий пост'})
+        self.assertIn(REPLICA_PIN_COOKIE, response.cookies)
+        response, _, replica = self.get(
+            self.authorized_client,
+            reverse('posts:profile', args=(self.user.username,)))
+        self.assertContains(response, 'Свежий пост')
+        self.assertEqual(replica, [])
+
+    def test_changed_feed_reads_primary(self):
+        """После изменения ленты её страницы читают с основной базы
+        REPLICA_PIN_SECONDS, даже у клиентов без куки привязки."""
+        url = reverse('posts:group_list', args=(self.group.slug,))
+        other = User.objects.create_user(username='OtherUser')
+        Post.objects.create(
+            author=self.user, text='Свежий пост', group=self.group)
+        response, _, replica = self.get(self.guest_client, url)
+        self.assertContains(response, 'Свежий пост')
+        self.assertEqual(replica, [])
+        _, _, replica = self.get(
+            self.guest_client,
+            reverse('posts:post_detail', args=(self.post.pk,)))
+        self.assertEqual(replica, [])
+        _, _, replica = self.get(
+            self.guest_client,
+            reverse('posts:profile', args=(other.username,)))
+        self.assertNotEqual(replica, [])
+        cache.clear()
+        _, _, replica = self.get(self.guest_client, url)
+        self.assertNotEqual(replica, [])
+
+    @override_settings(REPLICA_DATABASES=[])
+    def test_no_pin_cookie_without_replicas(self):
+        """Без реплик кука привязки не ставится."""
+        self.authorized_client.post(
+            reverse('posts:post_create'), {'text': 'Свежий пост'})
+        self.assertNotIn(REPLICA_PIN_COOKIE, self.authorized_client.cookies)
@@ -0,0 +1,90 @@
+import gzip
+import os
+import tempfile
+from io import StringIO
+from unittest import skipUnless
+
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management import call_command
+from django.http import HttpResponse
+from django.templatetags.static import static
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from core.middleware import IMMUTABLE_CACHE_CONTROL, StaticAssetsMiddleware
+from core.storage import brotli
+
+CSS = 'css/bootstrap.min.css'
+
+
+class StaticPipelineTests(SimpleTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.static_root = tempfile.TemporaryDirectory()
+        cls.settings = override_settings(
+            STATIC_ROOT=cls.static_root.name,
+            STATICFILES_STORAGE=(
+                'core.storage.CompressedManifestStaticFilesStorage'),
+        )
+        cls.settings.enable()
+        call_command('collectstatic', interactive=False, verbosity=0,
+                     stdout=StringIO())
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.settings.disable()
+        cls.static_root.cleanup()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.middleware = StaticAssetsMiddleware(
+            lambda request: HttpResponse('view'))
+        self.hashed_css = staticfiles_storage.stored_name(CSS)
+
+    def get(self, path, **headers):
+        return self.middleware(RequestFactory().get(path, **headers))
+
+    def test_static_urls_contain_content_hash(self):
+        """Ссылки на статику содержат хеш содержимого."""
+        self.assertNotEqual(self.hashed_css, CSS)
+        self.assertEqual(static(CSS), '/static/' + self.hashed_css)
+
+    def test_gzip_variant_is_built(self):
+        """Рядом с текстовым файлом собирается .gz того же содержимого."""
+        path = staticfiles_storage.path(self.hashed_css)
+        with open(path, 'rb') as source, gzip.open(path + '.gz') as packed:
+            self.assertEqual(packed.read(), source.read())
+        self.assertFalse(os.path.exists(
+            staticfiles_storage.path('img/logo.png') + '.gz'))
+
+    @skipUnless(brotli, 'Нужен пакет brotli')
+    def test_brotli_variant_is_preferred(self):
+        """При поддержке br отдаётся вариант brotli."""
+        response = self.get(static(CSS), HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertEqual(response['Content-Encoding'], 'br')
+
+    def test_hashed_file_is_served_compressed_and_immutable(self):
+        """Файл с хешем отдаётся сжатым и с бессрочным кешем."""
+        response = self.get(static(CSS), HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Content-Type'], 'text/css')
+        self.assertEqual(response['Cache-Control'], IMMUTABLE_CACHE_CONTROL)
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        content = gzip.decompress(b''.join(response.streaming_content))
+        with open(staticfiles_storage.path(self.hashed_css), 'rb') as source:
+            self.assertEqual(content, source.read())
+
+    def test_plain_file_without_hash_has_short_cache(self):
+        """Без поддержки сжатия и без хеша файл отдаётся как есть
+        с ограниченным сроком кеша."""
+        response = self.get('/static/' + CSS)
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertNotIn('immutable', response['Cache-Control'])
+
+    def test_other_requests_pass_through(self):
+        """Прочие адреса уходят дальше по цепочке middleware."""
+        for path in ('/', '/static/no-such-file.css'):
+            with self.subTest(path=path):
+                self.assertEqual(self.get(path).content, b'view')
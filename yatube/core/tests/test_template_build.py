@@ -0,0 +1,122 @@
+import copy
+import os
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.checks import run_checks
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core.template_build import (DIGEST_FILE, build_templates,
+                                 inline_includes, is_fresh)
+from posts.models import Group, Post, User
+from posts.tests.test_views import POST_TEXT
+
+TESTS_RECORDS_COUNT = 13
+
+
+class TemplateBuildTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='AutoTestUser')
+        cls.group = Group.objects.create(
+            title='Test group',
+            slug='test_slug',
+            description='This is a test group!',
+        )
+        Post.objects.bulk_create([
+            Post(
+                author=cls.user,
+                text=POST_TEXT.format(num + 1),
+                group=cls.group
+            ) for num in range(TESTS_RECORDS_COUNT)
+        ])
+
+    def setUp(self):
+        build_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(build_dir.cleanup)
+        self.build_dir = build_dir.name
+        build_templates([settings.TEMPLATES_DIR], self.build_dir)
+
+    def read_built(self, name):
+        with open(os.path.join(self.build_dir, name), encoding='utf-8') as f:
+            return f.read()
+
+    def test_static_includes_are_inlined(self):
+        """Статические include лент и base.html заменены текстом."""
+        for name, include in (
+            ('posts/index.html', 'includes/post.html'),
+            ('posts/index.html', 'posts/includes/paginator.html'),
+            ('base.html', 'includes/header.html'),
+            ('base.html', 'includes/footer.html'),
+        ):
+            with self.subTest(name=name, include=include):
+                self.assertNotIn(include, self.read_built(name))
+
+    def test_build_templates_command(self):
+        """Команда build_templates собирает все шаблоны проекта."""
+        with tempfile.TemporaryDirectory() as output:
+            call_command('build_templates', output=output,
+                         stdout=StringIO())
+            self.assertTrue(os.path.isfile(
+                os.path.join(output, 'posts', 'includes', 'paginator.html')))
+
+    def test_build_goes_stale_when_sources_change(self):
+        """Сборка перестаёт быть актуальной после правки или удаления
+        исходного шаблона, а пересборка убирает лишние."""
+        with tempfile.TemporaryDirectory() as source_dir:
+            page = os.path.join(source_dir, 'page.html')
+            with open(page, 'w') as f:
+                f.write('{% include "part.html" %}')
+            with open(os.path.join(source_dir, 'part.html'), 'w') as f:
+                f.write('часть')
+            build_templates([source_dir], self.build_dir)
+            self.assertTrue(is_fresh(self.build_dir, [source_dir]))
+            with open(os.path.join(source_dir, 'part.html'), 'w') as f:
+                f.write('новая часть')
+            self.assertFalse(is_fresh(self.build_dir, [source_dir]))
+            build_templates([source_dir], self.build_dir)
+            self.assertEqual(self.read_built('page.html'), 'новая часть')
+            os.remove(page)
+            self.assertFalse(is_fresh(self.build_dir, [source_dir]))
+            build_templates([source_dir], self.build_dir)
+            self.assertTrue(is_fresh(self.build_dir, [source_dir]))
+            self.assertFalse(os.path.exists(
+                os.path.join(self.build_dir, 'page.html')))
+
+    def test_stale_build_is_reported_by_check(self):
+        """manage.py check предупреждает об устаревшей сборке."""
+        with override_settings(TEMPLATES_BUILD_DIR=self.build_dir):
+            self.assertFalse([message for message in run_checks()
+                              if message.id == 'core.W001'])
+            with open(os.path.join(self.build_dir, DIGEST_FILE), 'w') as f:
+                f.write('old')
+            self.assertEqual([message.id for message in run_checks()
+                              if message.id == 'core.W001'], ['core.W001'])
+
+    def test_templates_with_blocks_are_not_inlined(self):
+        """Шаблон с блоками остаётся подключённым через include."""
+        dirs = [self.build_dir]
+        with open(os.path.join(self.build_dir, 'blocks.html'), 'w') as f:
+            f.write('{% block content %}{% endblock %}')
+        source = '{% include "blocks.html" %}{% include "missing.html" %}'
+        self.assertEqual(inline_includes(source, dirs), source)
+
+    def test_built_templates_render_the_same_pages(self):
+        """Собранные шаблоны дают те же страницы, что и исходные."""
+        templates = copy.deepcopy(settings.TEMPLATES)
+        templates[0]['DIRS'] = [self.build_dir, settings.TEMPLATES_DIR]
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:index') + '?page=2',
+            reverse('posts:group_list', args=(self.group.slug,)),
+            reverse('posts:profile', args=(self.user.username,)),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                expected = Client().get(url).content
+                with override_settings(TEMPLATES=templates):
+                    self.assertEqual(Client().get(url).content, expected)
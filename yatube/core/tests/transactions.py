@@ -0,0 +1,22 @@
+from contextlib import contextmanager
+
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+@contextmanager
+def run_on_commit(using=DEFAULT_DB_ALIAS):
+    """Выполняет обработчики transaction.on_commit, добавленные в блоке.
+
+    TestCase держит тест в транзакции, которая откатывается, и такие
+    обработчики не вызываются; это аналог captureOnCommitCallbacks
+    (execute=True) из Django 3.2.
+    """
+    connection = connections[using]
+    start = len(connection.run_on_commit)
+    try:
+        yield
+    finally:
+        callbacks = [func for _, func in connection.run_on_commit[start:]]
+        del connection.run_on_commit[start:]
+        for callback in callbacks:
+            callback()
@@ -0,0 +1,13 @@
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import JsonResponse
+from django.views.decorators.cache import never_cache
+
+from .instrumentation import stats
+
+
+@never_cache
+@staff_member_required
+def instrumentation_stats(request):
+    """Перцентили замеров по каждому view_name в этом процессе."""
+    return JsonResponse(stats.summary(),
+                        json_dumps_params={'ensure_ascii': False})
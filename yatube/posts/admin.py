@@ -1,14 +1,31 @@
 from django.contrib import admin
+from django.http import StreamingHttpResponse
 
+from .export import CONTENT_TYPES, export_lines
 from .models import Group, Post
 
 
+def export_action(export_format):
+    def action(modeladmin, request, queryset):
+        response = StreamingHttpResponse(
+            export_lines(export_format, queryset),
+            content_type=CONTENT_TYPES[export_format],
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="posts.{export_format}"')
+        return response
+    action.__name__ = f'export_{export_format}'
+    action.short_description = f'Выгрузить в {export_format.upper()}'
+    return action
+
+
 class PostAdmin(admin.ModelAdmin):
     list_display = ('pk', 'text', 'pub_date', 'author', 'group')
     search_fields = ('text',)
     list_filter = ('pub_date',)
     list_editable = ('group',)
     empty_value_display = '-пусто-'
+    actions = (export_action('ndjson'), export_action('csv'))
 
 
 admin.site.register(Group)
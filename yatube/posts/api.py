@@ -0,0 +1,125 @@
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import Http404, JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET
+
+from .models import Group, Post, User
+from .utils import (CURSOR_AFTER_PARAM, CURSOR_BEFORE_PARAM, POSTS_PER_PAGE,
+                    decode_cursor, keyset_slice, make_cursor)
+
+API_MAX_LIMIT = 100
+POST_VALUES = (
+    'id', 'text', 'pub_date', 'updated',
+    'author__username', 'author__first_name', 'author__last_name',
+    'group__slug', 'group__title',
+)
+
+
+def serialize_post(row):
+    full_name = f'{row["author__first_name"]} {row["author__last_name"]}'
+    return {
+        'id': row['id'],
+        'text': row['text'],
+        'pub_date': row['pub_date'],
+        'updated': row['updated'],
+        'author': {
+            'username': row['author__username'],
+            'full_name': full_name.strip(),
+        },
+        'group': {
+            'slug': row['group__slug'],
+            'title': row['group__title'],
+        } if row['group__slug'] is not None else None,
+    }
+
+
+def _dumps(value):
+    return json.dumps(value, cls=DjangoJSONEncoder, ensure_ascii=False)
+
+
+def _limit(request):
+    try:
+        limit = int(request.GET.get('limit', POSTS_PER_PAGE))
+    except ValueError:
+        return POSTS_PER_PAGE
+    return max(1, min(limit, API_MAX_LIMIT))
+
+
+def _stream_page(rows, limit, backwards, has_cursor):
+    """Пишет страницу ленты в JSON по мере чтения строк из курсора."""
+    if backwards:
+        rows = list(rows)
+        has_more = len(rows) > limit
+        rows = rows[:limit][::-1]
+    yield '{"results": ['
+    first = last = None
+    count = 0
+    has_next = False
+    for row in rows:
+        if count == limit:
+            # Строка limit + 1 не выводится: она лишь показывает, что
+            # за страницей есть продолжение.
+            has_next = True
+            break
+        yield (',' if count else '') + _dumps(serialize_post(row))
+        first = first or row
+        last = row
+        count += 1
+    if backwards:
+        has_next, has_previous = True, has_more
+    else:
+        has_previous = has_cursor
+    cursors = {
+        'next': make_cursor(last['pub_date'], last['id'])
+        if has_next and last else None,
+        'previous': make_cursor(first['pub_date'], first['id'])
+        if has_previous and first else None,
+    }
+    yield '], ' + _dumps(cursors)[1:]
+
+
+def feed_response(request, queryset):
+    limit = _limit(request)
+    after = request.GET.get(CURSOR_AFTER_PARAM)
+    before = request.GET.get(CURSOR_BEFORE_PARAM)
+    page, backwards = keyset_slice(
+        queryset.values(*POST_VALUES), limit + 1, after, before)
+    rows = page.iterator()
+    return StreamingHttpResponse(
+        _stream_page(rows, limit, backwards,
+                     bool(after and decode_cursor(after))),
+        content_type='application/json',
+    )
+
+
+@require_GET
+def index(request):
+    return feed_response(request, Post.objects.all())
+
+
+@require_GET
+def group_posts(request, slug):
+    group_id = Group.objects.filter(slug=slug).values_list(
+        'pk', flat=True).first()
+    if group_id is None:
+        raise Http404
+    return feed_response(request, Post.objects.filter(group_id=group_id))
+
+
+@require_GET
+def profile(request, username):
+    author_id = User.objects.filter(username=username).values_list(
+        'pk', flat=True).first()
+    if author_id is None:
+        raise Http404
+    return feed_response(request, Post.objects.filter(author_id=author_id))
+
+
+@require_GET
+def post_detail(request, post_id):
+    row = Post.objects.filter(pk=post_id).values(*POST_VALUES).first()
+    if row is None:
+        raise Http404
+    return JsonResponse(serialize_post(row),
+                        json_dumps_params={'ensure_ascii': False})
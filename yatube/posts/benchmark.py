@@ -0,0 +1,140 @@
+import json
+import os
+import statistics
+import subprocess
+import time
+import tracemalloc
+from datetime import datetime
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Count
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from . import urls
+from .datagen import WORDS
+from .models import Group, Post, User
+
+RESULTS_PATH = os.path.join(settings.BASE_DIR, 'benchmarks', 'results.jsonl')
+
+
+def _top_author():
+    return (User.objects.annotate(posts_count=Count('posts'))
+            .order_by('-posts_count').first())
+
+
+def _top_group():
+    return (Group.objects.annotate(posts_count=Count('posts'))
+            .order_by('-posts_count').first())
+
+
+def _latest_post(author):
+    return Post.objects.filter(author=author).first()
+
+
+# Имя URL из posts.urls -> (нужен ли вход, построитель адреса).
+TARGETS = {
+    'index': (False, lambda author: reverse('posts:index')),
+    'group_list': (False, lambda author: reverse(
+        'posts:group_list', args=(_top_group().slug,))),
+    'profile': (False, lambda author: reverse(
+        'posts:profile', args=(author.username,))),
+    'post_detail': (False, lambda author: reverse(
+        'posts:post_detail', args=(_latest_post(author).pk,))),
+    'post_create': (True, lambda author: reverse('posts:post_create')),
+    'post_edit': (True, lambda author: reverse(
+        'posts:post_edit', args=(_latest_post(author).pk,))),
+    'search': (False, lambda author: reverse(
+        'posts:search') + f'?q={WORDS[0]}'),
+}
+
+
+def check_targets():
+    names = {pattern.name for pattern in urls.urlpatterns}
+    missing = names - TARGETS.keys()
+    if missing:
+        raise LookupError(
+            f'Нет сценария бенчмарка для URL: {", ".join(sorted(missing))}')
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def measure(client, url, repeat):
+    """Время и память меряются разными проходами: tracemalloc
+    замедляет каждый вызов и исказил бы медиану и p95."""
+    client.get(url)
+    timings = []
+    for _ in range(repeat):
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            response = client.get(url)
+            timings.append((time.perf_counter() - started) * 1000)
+    tracemalloc.start()
+    try:
+        client.get(url)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    timings.sort()
+    return {
+        'status': response.status_code,
+        'median_ms': round(statistics.median(timings), 3),
+        'p95_ms': round(timings[int(0.95 * (len(timings) - 1))], 3),
+        'queries': len(queries),
+        'peak_kib': round(peak / 1024, 1),
+        'response_bytes': len(response.content),
+    }
+
+
+@override_settings(POSTS_PAGE_CACHE_TIMEOUT=0)
+def run(size, repeat):
+    """Меряет каждый URL из posts.urls на текущей базе.
+
+    Кеш страниц отключён, чтобы мерить сами представления.
+    """
+    check_targets()
+    author = _top_author()
+    guest, member = Client(), Client()
+    member.force_login(author)
+    revision = git_revision()
+    created = datetime.utcnow().isoformat(timespec='seconds')
+    results = []
+    for name, (login_required, build_url) in TARGETS.items():
+        url = build_url(author)
+        result = measure(member if login_required else guest, url, repeat)
+        result.update(name=name, url=url, posts=size,
+                      revision=revision, created=created)
+        results.append(result)
+    return results
+
+
+def load_results(path=RESULTS_PATH):
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding='utf-8') as source:
+        return [json.loads(line) for line in source if line.strip()]
+
+
+def save_results(results, path=RESULTS_PATH):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'a', encoding='utf-8') as output:
+        for result in results:
+            output.write(json.dumps(result, ensure_ascii=False) + '\n')
+
+
+def previous_result(history, result):
+    for old in reversed(history):
+        if (old['name'] == result['name'] and old['posts'] == result['posts']
+                and old['revision'] != result['revision']):
+            return old
+    return None
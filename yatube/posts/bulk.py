@@ -0,0 +1,37 @@
+from django.db import connections, router, transaction
+from django.db.models import Max
+
+from . import counters, search
+from .models import Post
+
+
+def _insert_posts(posts):
+    """Вставляет посты с pub_date и updated из самих объектов.
+
+    bulk_create перезаписал бы их текущим временем (auto_now_add
+    и auto_now); raw-вставка берёт значения полей как есть и не меняет
+    общие для всего процесса объекты полей модели.
+    """
+    fields = [field for field in Post._meta.concrete_fields
+              if not field.primary_key]
+    using = router.db_for_write(Post)
+    batch_size = max(
+        connections[using].ops.bulk_batch_size(fields, posts), 1)
+    for start in range(0, len(posts), batch_size):
+        Post.objects._insert(posts[start:start + batch_size],
+                             fields=fields, raw=True, using=using)
+
+
+def bulk_create_posts(posts):
+    """Пакетная вставка постов в обход сигналов Post, поэтому счётчики
+    и поисковый индекс обновляются здесь же, в той же транзакции
+    и только для созданных постов."""
+    with transaction.atomic():
+        # Новые посты — те, что с pk больше прежнего максимума, пока
+        # другие клиенты не пишут посты до конца транзакции.
+        counters.lock_posts('SHARE ROW EXCLUSIVE')
+        last_pk = Post.objects.aggregate(last=Max('pk'))['last'] or 0
+        _insert_posts(posts)
+        created = Post.objects.filter(pk__gt=last_pk)
+        counters.count_created(created)
+        search.index_posts(created)
@@ -0,0 +1,284 @@
+import hashlib
+import os
+import time
+import uuid
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache, caches
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.cache.utils import make_template_fragment_key
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils.http import quote_etag, urlencode
+
+from .models import Post
+from .utils import CURSOR_AFTER_PARAM, CURSOR_BEFORE_PARAM
+
+# Имя фрагмента из {% cache %} в templates/includes/post.html.
+POST_FRAGMENT_NAME = 'post_article'
+
+INDEX_SCOPE = 'index'
+
+# Параметры запроса, от которых зависит страница ленты; остальные
+# не попадают в ключ кеша и ETag, чтобы не плодить записи.
+PAGE_PARAMS = ('page', CURSOR_AFTER_PARAM, CURSOR_BEFORE_PARAM)
+# Заголовки, которые не копируются в кеш вместе со страницей.
+UNCACHED_HEADERS = ('set-cookie', 'vary')
+
+# Сколько держится блокировка пересчёта страницы.
+PAGE_LOCK_TIMEOUT = 10
+
+
+def post_fragment_key(post):
+    # Автор входит в ключ: его имя выводится во фрагменте, а updated
+    # поста при переименовании пользователя не меняется.
+    return make_template_fragment_key(
+        POST_FRAGMENT_NAME, [post.pk, post.updated, post.author.username,
+                             post.author.get_full_name()])
+
+
+def group_scope(slug):
+    return f'group:{slug}'
+
+
+def profile_scope(username):
+    return f'profile:{username}'
+
+
+def _hash(value):
+    return hashlib.md5(str(value).encode()).hexdigest()
+
+
+def _version_key(scope):
+    # Слаги и имена пользователей бывают не ASCII, а memcached
+    # принимает только ASCII без пробелов.
+    return f'posts:page-version:{_hash(scope)}'
+
+
+def _new_version():
+    # Каждая версия уникальна: если ключ версии вытеснен из кеша, старые
+    # страницы не станут снова актуальными, а два одновременных сброса
+    # не сольются в один, как при неатомарном incr файлового кеша.
+    return uuid.uuid4().hex
+
+
+def get_scope_version(scope):
+    return cache.get_or_set(_version_key(scope), _new_version, None)
+
+
+def _changed_key(scope):
+    return f'posts:page-changed:{_hash(scope)}'
+
+
+def invalidate_scopes(scopes):
+    """Сбрасывает страницы scopes после фиксации текущей транзакции.
+
+    До фиксации другой воркер прочитал бы новую версию, но старые строки,
+    и закешировал бы их под ней вместе с ETag. Счётчики и поисковый
+    индекс живут в той же базе и фиксируются вместе с постом.
+    """
+    scopes = list(scopes)
+    transaction.on_commit(lambda: _bump_scopes(scopes))
+
+
+def _bump_scopes(scopes):
+    cache.set_many({_version_key(scope): _new_version() for scope in scopes},
+                   None)
+    if settings.REPLICA_DATABASES:
+        # Реплики могут ещё не получить запись: страница, собранная
+        # с них, попала бы в кеш и под ETag новой версии.
+        cache.set_many({_changed_key(scope): True for scope in scopes},
+                       settings.REPLICA_PIN_SECONDS)
+
+
+def scope_changed(scope):
+    """Проверка pinned для core.routers.use_replica: scope сбрасывался
+    за последние REPLICA_PIN_SECONDS секунд, поэтому страница читает
+    с основной базы."""
+    def pinned(request, *args, **kwargs):
+        if not settings.REPLICA_DATABASES:
+            return False
+        return cache.get(_changed_key(scope(*args, **kwargs))) is not None
+    return pinned
+
+
+def page_path(request):
+    """Адрес страницы только с параметрами из PAGE_PARAMS."""
+    params = [(name, request.GET[name]) for name in PAGE_PARAMS
+              if name in request.GET]
+    return f'{request.path}?{urlencode(params)}' if params else request.path
+
+
+def page_cache_key(scope, request):
+    # Версии scope в ключе нет: она хранится в записи, чтобы после
+    # сброса было что отдать, пока страницу пересчитывает один воркер.
+    return f'posts:page:{_hash(scope)}:{_hash(page_path(request))}'
+
+
+def cache_anonymous_page(scope):
+    """Кеширует страницу для анонимных GET-запросов в рамках scope.
+
+    scope получает аргументы представления и возвращает имя области,
+    которую сбрасывает invalidate_scopes. Вместе со страницей хранятся
+    её заголовки, кроме кук и Vary.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if (not settings.POSTS_PAGE_CACHE_TIMEOUT
+                    or request.method != 'GET'
+                    or request.user.is_authenticated):
+                return view(request, *args, **kwargs)
+            name = scope(*args, **kwargs)
+            version = get_scope_version(name)
+            response = _single_flight(
+                page_cache_key(name, request), version,
+                lambda: view(request, *args, **kwargs))
+            page_version = getattr(response, 'page_version', version)
+            if page_version != version and settings.POSTS_CONDITIONAL_GET:
+                # Копия прежней версии не должна получить ETag текущей,
+                # иначе клиент будет получать на неё 304.
+                response['ETag'] = quote_etag(
+                    _page_etag(name, page_version, request))
+            return response
+        return wrapper
+    return decorator
+
+
+def _single_flight(key, version, render):
+    """Stale-while-revalidate: страницу пересчитывает один воркер.
+
+    Копия актуальна, пока не сменилась версия scope, но не дольше
+    POSTS_PAGE_CACHE_TIMEOUT секунд, и хранится до
+    POSTS_PAGE_CACHE_HARD_TIMEOUT. Устаревшую копию, в том числе
+    предыдущей версии после записи, пересчитывает воркер, взявший
+    блокировку; остальные тем временем получают её без запросов к базе.
+    Если копии нет вовсе, страница рендерится без ожидания, а в кеш
+    её кладёт только владелец блокировки.
+    """
+    entry = cache.get(key)
+    if (entry is not None and entry[0] == version
+            and time.time() < entry[-1]):
+        return _cached_response(entry)
+    lock_key = f'{key}:lock'
+    token = uuid.uuid4().hex
+    if not _acquire_lock(lock_key, token):
+        if entry is not None:
+            return _cached_response(entry)
+        return render()
+    try:
+        response = render()
+        if response.status_code == 200 and not response.cookies:
+            soft = settings.POSTS_PAGE_CACHE_TIMEOUT
+            hard = max(settings.POSTS_PAGE_CACHE_HARD_TIMEOUT, soft)
+            headers = [(name, value) for name, value in response.items()
+                       if name.lower() not in UNCACHED_HEADERS]
+            cache.set(key, (version, response.content, headers,
+                            time.time() + soft), hard)
+    finally:
+        _release_lock(lock_key, token)
+    return response
+
+
+def _lock_path(lock_key):
+    """Файл блокировки, если кеш файловый, иначе None."""
+    backend = caches[DEFAULT_CACHE_ALIAS]
+    if not isinstance(backend, FileBasedCache):
+        return None
+    return os.path.join(backend._dir, f'{_hash(lock_key)}.lock')
+
+
+def _acquire_lock(lock_key, token):
+    """Берёт блокировку на PAGE_LOCK_TIMEOUT секунд.
+
+    В FileBasedCache add() — это has_key и set без блокировки, поэтому
+    для него блокировка — файл, созданный с O_EXCL рядом с кешем.
+    """
+    path = _lock_path(lock_key)
+    if path is None:
+        return cache.add(lock_key, token, PAGE_LOCK_TIMEOUT)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    for _ in range(2):
+        try:
+            descriptor = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            try:
+                expired = (time.time() - os.path.getmtime(path)
+                           >= PAGE_LOCK_TIMEOUT)
+            except FileNotFoundError:
+                continue
+            if not expired:
+                return False
+            # Воркер, взявший блокировку, не снял её вовремя.
+            _remove(path)
+            continue
+        with os.fdopen(descriptor, 'w') as lock:
+            lock.write(token)
+        return True
+    return False
+
+
+def _release_lock(lock_key, token):
+    # Блокировка могла истечь и достаться другому воркеру.
+    path = _lock_path(lock_key)
+    if path is None:
+        if cache.get(lock_key) == token:
+            cache.delete(lock_key)
+        return
+    try:
+        with open(path) as lock:
+            owner = lock.read()
+    except FileNotFoundError:
+        return
+    if owner == token:
+        _remove(path)
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _cached_response(entry):
+    version, content, headers, _ = entry
+    response = HttpResponse(content)
+    for name, value in headers:
+        response[name] = value
+    response.page_version = version
+    return response
+
+
+def _etag(*parts):
+    return hashlib.md5(':'.join(map(str, parts)).encode()).hexdigest()
+
+
+def _page_etag(scope, version, request):
+    return _etag(scope, version, page_path(request), request.user.pk)
+
+
+def feed_etag(scope):
+    """Валидатор ленты: версия scope без обращения к базе."""
+    def etag(request, *args, **kwargs):
+        if not settings.POSTS_CONDITIONAL_GET:
+            return None
+        name = scope(*args, **kwargs)
+        return _page_etag(name, get_scope_version(name), request)
+    return etag
+
+
+def post_detail_etag(request, post_id):
+    if not settings.POSTS_CONDITIONAL_GET:
+        return None
+    row = Post.objects.filter(pk=post_id).values_list(
+        'updated', 'author__username', 'group__slug').first()
+    if row is None:
+        return None
+    updated, username, group_slug = row
+    # Версия профиля автора меняется вместе с его именем и числом
+    # постов, которые выводятся на странице поста.
+    return _etag(post_id, updated.isoformat(), group_slug,
+                 get_scope_version(profile_scope(username)),
+                 request.user.pk)
@@ -0,0 +1,124 @@
+from collections import defaultdict
+
+from django.db import connection, transaction
+from django.db.models import Count, F
+
+from .models import Post, PostCounter
+
+ALL_POSTS_KEY = 'all'
+
+
+def author_key(author_id):
+    return f'author:{author_id}'
+
+
+def group_key(group_id):
+    return f'group:{group_id}'
+
+
+def _queryset_for_key(key):
+    if key == ALL_POSTS_KEY:
+        return Post.objects.all()
+    scope, pk = key.split(':', 1)
+    return Post.objects.filter(**{f'{scope}_id': pk})
+
+
+def lock_posts(mode='SHARE'):
+    """Закрывает посты от записи другими клиентами до конца транзакции.
+
+    SQLite и так не пускает других писателей, пока транзакция пишет,
+    в Postgres берётся блокировка таблицы.
+    """
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'LOCK TABLE {Post._meta.db_table} IN {mode} MODE')
+
+
+def get_count(key):
+    """Возвращает счётчик постов; отсутствующий считается один раз.
+
+    Строка счётчика создаётся и заполняется в одной транзакции, пока
+    посты заблокированы от записи: bump, пришедший во время подсчёта,
+    применится уже к готовому счётчику.
+    """
+    count = PostCounter.objects.filter(key=key).values_list(
+        'count', flat=True).first()
+    if count is not None:
+        return count
+    with transaction.atomic():
+        counter, created = (PostCounter.objects.select_for_update()
+                            .get_or_create(key=key))
+        if created:
+            lock_posts()
+            counter.count = _queryset_for_key(key).count()
+            counter.save(update_fields=['count'])
+    return counter.count
+
+
+def get_all_count():
+    return get_count(ALL_POSTS_KEY)
+
+
+def get_author_count(author_id):
+    return get_count(author_key(author_id))
+
+
+def get_group_count(group_id):
+    return get_count(group_key(group_id))
+
+
+def post_keys(author_id, group_id):
+    keys = [ALL_POSTS_KEY, author_key(author_id)]
+    if group_id is not None:
+        keys.append(group_key(group_id))
+    return keys
+
+
+def bump(keys, delta):
+    # Отсутствующий счётчик не создаётся: get_count посчитает его
+    # с учётом этого изменения при первом чтении.
+    PostCounter.objects.filter(key__in=keys).update(count=F('count') + delta)
+
+
+def count_created(posts):
+    """Прибавляет к счётчикам посты, созданные в обход сигналов."""
+    deltas = {ALL_POSTS_KEY: posts.count()}
+    for scope in ('author', 'group'):
+        rows = (
+            posts.filter(**{f'{scope}__isnull': False})
+            .order_by()
+            .values_list(f'{scope}_id')
+            .annotate(total=Count('pk'))
+        )
+        deltas.update((f'{scope}:{pk}', total) for pk, total in rows)
+    keys_by_delta = defaultdict(list)
+    for key, delta in deltas.items():
+        if delta:
+            keys_by_delta[delta].append(key)
+    for delta, keys in keys_by_delta.items():
+        bump(keys, delta)
+
+
+def drop(keys):
+    PostCounter.objects.filter(key__in=keys).delete()
+
+
+def rebuild():
+    counters = [PostCounter(key=ALL_POSTS_KEY, count=Post.objects.count())]
+    for scope in ('author', 'group'):
+        rows = (
+            Post.objects.filter(**{f'{scope}__isnull': False})
+            .order_by()
+            .values(f'{scope}_id')
+            .annotate(total=Count('pk'))
+        )
+        counters.extend(
+            PostCounter(key=f'{scope}:{row[f"{scope}_id"]}',
+                        count=row['total'])
+            for row in rows
+        )
+    with transaction.atomic():
+        PostCounter.objects.all().delete()
+        PostCounter.objects.bulk_create(counters, batch_size=500)
+    return len(counters)
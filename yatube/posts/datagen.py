@@ -0,0 +1,107 @@
+import random
+from datetime import datetime, timedelta
+
+from django.utils import timezone
+
+from . import caching
+from .bulk import bulk_create_posts
+from .models import Group, Post, User
+
+DATAGEN_USERNAME = 'datagen_author_{}'
+DATAGEN_GROUP_SLUG = 'datagen-group-{}'
+DATAGEN_BATCH_SIZE = 5000
+# Показатель закона Ципфа: при 1.1 первые 1% авторов пишут больше
+# половины постов, а несколько групп собирают большую часть ленты.
+ZIPF_EXPONENT = 1.1
+UNGROUPED_SHARE = 0.3
+# Даты отсчитываются назад от фиксированного момента, чтобы набор
+# не зависел от времени запуска, а дозаписанные посты были старше.
+DATAGEN_ANCHOR = datetime(2024, 1, 1, tzinfo=timezone.utc)
+DATAGEN_STEP = timedelta(seconds=30)
+WORDS = (
+    'яндекс практикум джанго пост лента группа автор кеш индекс запрос '
+    'страница шаблон курсор база данных тест профиль поиск сервер клиент'
+).split()
+
+
+def zipf_weights(count, exponent=ZIPF_EXPONENT):
+    return [1 / (rank ** exponent) for rank in range(1, count + 1)]
+
+
+def generate_text(rng):
+    return ' '.join(rng.choices(WORDS, k=rng.randint(5, 60))).capitalize()
+
+
+def generate_dataset(posts, authors=1000, groups=50, seed=0,
+                     batch_size=DATAGEN_BATCH_SIZE, progress=None):
+    """Дописывает в базу синтетические посты до общего числа posts.
+
+    Набор воспроизводим при том же seed: авторы и группы выбираются
+    по весам Ципфа, каждый следующий пост на DATAGEN_STEP старше.
+    """
+    author_ids = _ensure_authors(authors)
+    group_ids = _ensure_groups(groups)
+    author_weights = zipf_weights(len(author_ids))
+    group_weights = zipf_weights(len(group_ids))
+    existing = Post.objects.count()
+    missing = posts - existing
+    if missing <= 0:
+        return 0
+    rng = random.Random(f'{seed}:{existing}')
+    created = 0
+    while created < missing:
+        size = min(batch_size, missing - created)
+        batch_authors = rng.choices(author_ids, author_weights, k=size)
+        batch_groups = rng.choices(group_ids, group_weights, k=size)
+        batch = []
+        for author_id, group_id in zip(batch_authors, batch_groups):
+            index = existing + created + len(batch)
+            pub_date = DATAGEN_ANCHOR - DATAGEN_STEP * index
+            batch.append(Post(
+                text=generate_text(rng),
+                pub_date=pub_date,
+                updated=pub_date,
+                author_id=author_id,
+                group_id=(None if rng.random() < UNGROUPED_SHARE
+                          else group_id),
+            ))
+        bulk_create_posts(batch)
+        created += size
+        if progress:
+            progress(existing + created, posts)
+    scopes = [caching.INDEX_SCOPE]
+    scopes.extend(caching.profile_scope(DATAGEN_USERNAME.format(num))
+                  for num in range(authors))
+    scopes.extend(caching.group_scope(DATAGEN_GROUP_SLUG.format(num))
+                  for num in range(groups))
+    caching.invalidate_scopes(scopes)
+    return created
+
+
+def _ensure_authors(count):
+    usernames = [DATAGEN_USERNAME.format(num) for num in range(count)]
+    prefix = DATAGEN_USERNAME.format('')
+    existing = set(User.objects.filter(
+        username__startswith=prefix).values_list('username', flat=True))
+    User.objects.bulk_create([
+        User(username=username, first_name='Автор', last_name=username,
+             password='!')
+        for username in usernames if username not in existing
+    ])
+    ids = dict(User.objects.filter(
+        username__startswith=prefix).values_list('username', 'pk'))
+    return [ids[username] for username in usernames]
+
+
+def _ensure_groups(count):
+    slugs = [DATAGEN_GROUP_SLUG.format(num) for num in range(count)]
+    prefix = DATAGEN_GROUP_SLUG.format('')
+    existing = set(Group.objects.filter(
+        slug__startswith=prefix).values_list('slug', flat=True))
+    Group.objects.bulk_create([
+        Group(slug=slug, title=f'Группа {slug}', description='Синтетика')
+        for slug in slugs if slug not in existing
+    ])
+    ids = dict(Group.objects.filter(
+        slug__startswith=prefix).values_list('slug', 'pk'))
+    return [ids[slug] for slug in slugs]
@@ -0,0 +1,57 @@
+import csv
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import Post
+
+EXPORT_CHUNK_SIZE = 2000
+# Колонка выгрузки -> поле для values().
+EXPORT_COLUMNS = {
+    'id': 'id',
+    'text': 'text',
+    'pub_date': 'pub_date',
+    'updated': 'updated',
+    'author': 'author__username',
+    'author_first_name': 'author__first_name',
+    'author_last_name': 'author__last_name',
+    'group': 'group__slug',
+    'group_title': 'group__title',
+}
+EXPORT_FORMATS = ('ndjson', 'csv')
+CONTENT_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+
+def export_rows(queryset=None, chunk_size=EXPORT_CHUNK_SIZE):
+    """Строки постов по одной; на PostgreSQL iterator() читает
+    серверным курсором, так что память не зависит от размера таблицы."""
+    if queryset is None:
+        queryset = Post.objects.all()
+    rows = queryset.order_by('pk').values_list(*EXPORT_COLUMNS.values())
+    for row in rows.iterator(chunk_size=chunk_size):
+        yield dict(zip(EXPORT_COLUMNS, row))
+
+
+def ndjson_lines(rows):
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    for row in rows:
+        yield encoder.encode(row) + '\n'
+
+
+class _Echo:
+    def write(self, value):
+        return value
+
+
+def csv_lines(rows):
+    writer = csv.DictWriter(_Echo(), fieldnames=list(EXPORT_COLUMNS))
+    yield writer.writerow(dict(zip(EXPORT_COLUMNS, EXPORT_COLUMNS)))
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def export_lines(export_format, queryset=None):
+    writers = {'ndjson': ndjson_lines, 'csv': csv_lines}
+    return writers[export_format](export_rows(queryset))
@@ -0,0 +1,62 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from posts.datagen import (DATAGEN_GROUP_SLUG, DATAGEN_USERNAME,
+                           generate_dataset)
+from posts.models import Group, Post, User
+from posts.utils import POSTS_PER_PAGE
+
+
+class Command(BaseCommand):
+    help = ('Засевает базу постами и выводит план и время запросов '
+            'лент index, profile и group_list.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=1_000_000)
+        parser.add_argument('--authors', type=int, default=100)
+        parser.add_argument('--groups', type=int, default=20)
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        generate_dataset(options['posts'], options['authors'],
+                         options['groups'])
+        author = User.objects.get(username=DATAGEN_USERNAME.format(0))
+        group = Group.objects.get(slug=DATAGEN_GROUP_SLUG.format(0))
+        feeds = {
+            'index': Post.objects.feed(),
+            'profile': Post.objects.feed().filter(author=author),
+            'group_list': Post.objects.feed().filter(group=group),
+        }
+        for name, queryset in feeds.items():
+            first_page = queryset[:POSTS_PER_PAGE]
+            last = list(queryset.values_list('pub_date', 'pk')[
+                POSTS_PER_PAGE * 100:POSTS_PER_PAGE * 100 + 1])
+            self.stdout.write(self.style.MIGRATE_HEADING(name))
+            self.stdout.write(first_page.explain())
+            self.report('first page', first_page, options['repeat'])
+            if last:
+                pub_date, pk = last[0]
+                deep_page = queryset.filter(
+                    Q(pub_date__lt=pub_date) | Q(pub_date=pub_date, pk__lt=pk)
+                )
+                self.report('page 101 (cursor)',
+                            deep_page[:POSTS_PER_PAGE], options['repeat'])
+                self.report(
+                    'page 101 (offset)',
+                    queryset[POSTS_PER_PAGE * 100:POSTS_PER_PAGE * 101],
+                    options['repeat'],
+                )
+
+    def report(self, label, queryset, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            list(queryset.all())
+            timings.append((time.perf_counter() - started) * 1000)
+        self.stdout.write(
+            f'  {label}: median {statistics.median(timings):.2f} ms, '
+            f'max {max(timings):.2f} ms'
+        )
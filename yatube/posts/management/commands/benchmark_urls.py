@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import benchmark
+from posts.datagen import generate_dataset
+
+
+class Command(BaseCommand):
+    help = ('Дописывает синтетические посты до каждого из размеров и меряет '
+            'время, число запросов и память для всех URL posts. '
+            'Запускать на отдельной базе: данные остаются в ней.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+',
+                            default=[10_000, 100_000, 1_000_000])
+        parser.add_argument('--repeat', type=int, default=10)
+        parser.add_argument('--authors', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=50)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', default=benchmark.RESULTS_PATH)
+
+    def handle(self, *args, **options):
+        try:
+            benchmark.check_targets()
+        except LookupError as error:
+            raise CommandError(error)
+        history = benchmark.load_results(options['output'])
+        for size in sorted(options['sizes']):
+            generate_dataset(size, options['authors'], options['groups'],
+                             options['seed'])
+            results = benchmark.run(size, options['repeat'])
+            benchmark.save_results(results, options['output'])
+            self.stdout.write(self.style.MIGRATE_HEADING(f'{size} постов'))
+            for result in results:
+                self.stdout.write(self.format(
+                    result, benchmark.previous_result(history, result)))
+
+    def format(self, result, previous):
+        line = (
+            f'  {result["name"]:<12} {result["status"]} '
+            f'median {result["median_ms"]:>8.2f} ms  '
+            f'p95 {result["p95_ms"]:>8.2f} ms  '
+            f'{result["queries"]:>3} SQL  '
+            f'{result["peak_kib"]:>8.1f} KiB  '
+            f'{result["response_bytes"]:>8} B'
+        )
+        if previous:
+            change = (result['median_ms'] / previous['median_ms'] - 1) * 100
+            line += (f'  ({change:+.0f}% к {previous["revision"]}, '
+                     f'SQL было {previous["queries"]})')
+        return line
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from posts.export import EXPORT_FORMATS, export_lines
+
+
+class Command(BaseCommand):
+    help = ('Потоково выгружает посты с авторами и группами '
+            'в NDJSON или CSV.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=EXPORT_FORMATS,
+                            default='ndjson')
+        parser.add_argument('--output', default='-',
+                            help='Файл для выгрузки; «-» — stdout.')
+
+    def handle(self, *args, **options):
+        if options['output'] == '-':
+            self.write(self.stdout, options['format'])
+            return
+        with open(options['output'], 'w', encoding='utf-8',
+                  newline='') as output:
+            total = self.write(output, options['format'])
+        self.stderr.write(f'Выгружено строк: {total}')
+
+    def write(self, output, export_format):
+        total = 0
+        for line in export_lines(export_format):
+            output.write(line)
+            total += 1
+        return total
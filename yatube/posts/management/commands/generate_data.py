@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from posts.datagen import generate_dataset
+
+
+class Command(BaseCommand):
+    help = ('Дописывает в базу воспроизводимый синтетический набор: '
+            'несколько плодовитых авторов и крупных групп.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=10_000)
+        parser.add_argument('--authors', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=50)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        created = generate_dataset(
+            options['posts'], options['authors'], options['groups'],
+            options['seed'], progress=self.progress,
+        )
+        self.stdout.write(self.style.SUCCESS(f'Создано постов: {created}'))
+
+    def progress(self, done, total):
+        self.stdout.write(f'{done}/{total}', ending='\r')
@@ -0,0 +1,175 @@
+import csv
+import json
+import sys
+import time
+from contextlib import contextmanager
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from posts import caching
+from posts.bulk import bulk_create_posts
+from posts.export import EXPORT_FORMATS
+from posts.models import Group, Post, User
+
+BATCH_SIZE = 5000
+REQUIRED_FIELDS = ('author', 'text')
+DATE_FIELDS = ('pub_date', 'updated')
+
+
+class Command(BaseCommand):
+    help = ('Пакетно загружает посты и группы из NDJSON или CSV '
+            '(формат export_posts) через bulk_create.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл для загрузки; «-» — stdin.')
+        parser.add_argument('--format', choices=EXPORT_FORMATS)
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument(
+            '--create-authors', action='store_true',
+            help='Создавать отсутствующих авторов без пароля.')
+
+    def handle(self, *args, **options):
+        export_format = options['format'] or (
+            'csv' if options['path'].endswith('.csv') else 'ndjson')
+        self.create_authors = options['create_authors']
+        self.authors = {}
+        self.groups = {}
+        self.skipped = 0
+        self.scopes = {caching.INDEX_SCOPE}
+        started = time.perf_counter()
+        imported = 0
+        try:
+            with self.open(options['path']) as source:
+                rows = self.read(source, export_format)
+                while True:
+                    batch = list(islice(rows, options['batch_size']))
+                    if not batch:
+                        break
+                    imported += self.import_batch(batch)
+                    self.report(imported, started, ending='\r')
+        except CommandError as error:
+            raise CommandError(
+                f'{error}. Загружено постов до ошибки: {imported}')
+        finally:
+            # Пакеты, загруженные до ошибки, уже в базе и видны в лентах.
+            caching.invalidate_scopes(self.scopes)
+        self.report(imported, started)
+        if self.skipped:
+            self.stdout.write(self.style.WARNING(
+                f'Пропущено строк без автора: {self.skipped}'))
+
+    @contextmanager
+    def open(self, path):
+        if path == '-':
+            yield sys.stdin
+            return
+        try:
+            source = open(path, encoding='utf-8', newline='')
+        except FileNotFoundError:
+            raise CommandError(f'Файл {path} не найден')
+        with source:
+            yield source
+
+    def read(self, source, export_format):
+        if export_format == 'csv':
+            for number, row in enumerate(csv.DictReader(source), 2):
+                yield self.clean(number, row)
+            return
+        for number, line in enumerate(source, 1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as error:
+                raise CommandError(f'Строка {number}: неверный JSON: {error}')
+            yield self.clean(number, row)
+
+    @staticmethod
+    def clean(number, row):
+        """Проверяет строку файла до загрузки и разбирает даты."""
+        if not isinstance(row, dict):
+            raise CommandError(f'Строка {number}: ожидался объект')
+        for field in REQUIRED_FIELDS:
+            if not isinstance(row.get(field), str) or not row[field]:
+                raise CommandError(f'Строка {number}: нет поля {field}')
+        for field in DATE_FIELDS:
+            value = row.get(field)
+            if not value:
+                row[field] = None
+                continue
+            try:
+                row[field] = parse_datetime(str(value))
+            except ValueError:
+                row[field] = None
+            if row[field] is None:
+                raise CommandError(
+                    f'Строка {number}: неверная дата {field}: {value}')
+        return row
+
+    def report(self, imported, started, ending='\n'):
+        elapsed = time.perf_counter() - started
+        rate = imported / elapsed if elapsed else 0
+        self.stdout.write(
+            f'Загружено постов: {imported} ({rate:.0f} строк/с)',
+            ending=ending)
+
+    def resolve_authors(self, usernames):
+        missing = usernames - self.authors.keys()
+        if not missing:
+            return
+        self.authors.update(User.objects.filter(
+            username__in=missing).values_list('username', 'pk'))
+        missing -= self.authors.keys()
+        if missing and self.create_authors:
+            User.objects.bulk_create(
+                [User(username=username, password='!')
+                 for username in missing])
+            self.authors.update(User.objects.filter(
+                username__in=missing).values_list('username', 'pk'))
+
+    def resolve_groups(self, titles):
+        missing = titles.keys() - self.groups.keys()
+        if not missing:
+            return
+        self.groups.update(Group.objects.filter(
+            slug__in=missing).values_list('slug', 'pk'))
+        missing -= self.groups.keys()
+        if missing:
+            Group.objects.bulk_create([
+                Group(slug=slug, title=titles[slug] or slug, description='')
+                for slug in missing
+            ])
+            self.groups.update(Group.objects.filter(
+                slug__in=missing).values_list('slug', 'pk'))
+
+    def import_batch(self, batch):
+        now = timezone.now()
+        with transaction.atomic():
+            self.resolve_authors({row['author'] for row in batch})
+            self.resolve_groups({
+                row['group']: row.get('group_title')
+                for row in batch if row.get('group')
+            })
+            posts = []
+            for row in batch:
+                author_id = self.authors.get(row['author'])
+                if author_id is None:
+                    self.skipped += 1
+                    continue
+                pub_date = row['pub_date'] or now
+                posts.append(Post(
+                    text=row['text'],
+                    pub_date=pub_date,
+                    updated=row['updated'] or pub_date,
+                    author_id=author_id,
+                    group_id=self.groups.get(row.get('group') or None),
+                ))
+                self.scopes.add(caching.profile_scope(row['author']))
+                if row.get('group'):
+                    self.scopes.add(caching.group_scope(row['group']))
+            bulk_create_posts(posts)
+        return len(posts)
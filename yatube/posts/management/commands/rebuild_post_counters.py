@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from posts import counters
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счётчики постов: общий, по авторам и по группам.'
+
+    def handle(self, *args, **options):
+        total = counters.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f'Пересчитано счётчиков: {total}'))
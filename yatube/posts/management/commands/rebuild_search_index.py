@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from posts import search
+
+
+class Command(BaseCommand):
+    help = ('Перестраивает полнотекстовый индекс постов (SQLite FTS5), '
+            'например после bulk_create в обход сигналов.')
+
+    def handle(self, *args, **options):
+        search.rebuild_index()
+        self.stdout.write(self.style.SUCCESS('Поисковый индекс перестроен'))
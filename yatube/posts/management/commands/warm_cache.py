@@ -0,0 +1,69 @@
+from math import ceil
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+from django.urls import resolve, reverse
+
+from posts import counters
+from posts.models import Group, PostCounter, User
+from posts.utils import POSTS_PER_PAGE
+
+
+class Command(BaseCommand):
+    help = ('Заранее рендерит первые страницы главной, самых больших групп '
+            'и самых активных авторов, чтобы прогреть кеш после деплоя. '
+            'Размеры лент берутся из счётчиков постов '
+            '(manage.py rebuild_post_counters).')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pages', type=int, default=3)
+        parser.add_argument('--groups', type=int, default=10)
+        parser.add_argument('--profiles', type=int, default=10)
+
+    def handle(self, *args, **options):
+        if not settings.POSTS_PAGE_CACHE_TIMEOUT:
+            self.stdout.write(self.style.WARNING(
+                'POSTS_PAGE_CACHE_TIMEOUT = 0: кеш страниц отключён, '
+                'прогреваются только фрагменты постов и счётчики.'))
+        feeds = [(reverse('posts:index'), counters.get_all_count())]
+        groups = self.largest('group', options['groups'])
+        slugs = dict(Group.objects.filter(
+            pk__in=groups).values_list('pk', 'slug'))
+        feeds.extend(
+            (reverse('posts:group_list', args=(slugs[pk],)), posts_count)
+            for pk, posts_count in groups.items() if pk in slugs
+        )
+        authors = self.largest('author', options['profiles'])
+        usernames = dict(User.objects.filter(
+            pk__in=authors).values_list('pk', 'username'))
+        feeds.extend(
+            (reverse('posts:profile', args=(usernames[pk],)), posts_count)
+            for pk, posts_count in authors.items() if pk in usernames
+        )
+        warmed = 0
+        for url, posts_count in feeds:
+            pages = min(options['pages'], ceil(posts_count / POSTS_PER_PAGE))
+            for page in range(1, max(pages, 1) + 1):
+                self.render(url, {'page': page} if page > 1 else {})
+                warmed += 1
+        self.stdout.write(self.style.SUCCESS(f'Прогрето страниц: {warmed}'))
+
+    @staticmethod
+    def largest(scope, limit):
+        """pk -> число постов для limit самых больших лент scope."""
+        rows = (
+            PostCounter.objects.filter(key__startswith=f'{scope}:',
+                                       count__gt=0)
+            .order_by('-count')
+            .values_list('key', 'count')[:limit]
+        )
+        return {int(key.split(':', 1)[1]): count for key, count in rows}
+
+    def render(self, url, params):
+        request = RequestFactory().get(url, params)
+        request.user = AnonymousUser()
+        request.resolver_match = resolve(url)
+        view, args, kwargs = request.resolver_match
+        return view(request, *args, **kwargs)
@@ -0,0 +1,36 @@
+from django.db import migrations
+
+SQLITE_FORWARD = [
+    "CREATE VIRTUAL TABLE posts_post_fts USING fts5("
+    "text, tokenize='unicode61 remove_diacritics 2')",
+    "INSERT INTO posts_post_fts(rowid, text) SELECT id, text FROM posts_post",
+]
+SQLITE_BACKWARD = ["DROP TABLE IF EXISTS posts_post_fts"]
+POSTGRES_FORWARD = [
+    "CREATE INDEX posts_post_text_fts ON posts_post "
+    "USING GIN (to_tsvector('russian', text))",
+]
+POSTGRES_BACKWARD = ["DROP INDEX IF EXISTS posts_post_text_fts"]
+
+
+def run(statements):
+    def operation(apps, schema_editor):
+        vendor_statements = statements.get(schema_editor.connection.vendor, [])
+        for statement in vendor_statements:
+            schema_editor.execute(statement)
+    return operation
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0010_post_updated'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run({'sqlite': SQLITE_FORWARD, 'postgresql': POSTGRES_FORWARD}),
+            run({'sqlite': SQLITE_BACKWARD,
+                 'postgresql': POSTGRES_BACKWARD}),
+        ),
+    ]
@@ -1,5 +1,5 @@
 from django.contrib.auth import get_user_model
-from django.db import models
+from django.db import models, transaction
 
 User = get_user_model()
 
@@ -15,9 +15,19 @@ class Group(models.Model):
         return str(self.title)
 
 
+class PostQuerySet(models.QuerySet):
+    def feed(self):
+        return self.select_related('author', 'group').only(
+            'text', 'pub_date', 'updated', 'author_id', 'group_id',
+            'author__username', 'author__first_name', 'author__last_name',
+            'group__slug', 'group__title',
+        )
+
+
 class Post(models.Model):
     text = models.TextField()
     pub_date = models.DateTimeField(auto_now_add=True)
+    updated = models.DateTimeField(auto_now=True)
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -31,6 +41,13 @@ class Post(models.Model):
         null=True,
     )
 
+    objects = PostQuerySet.as_manager()
+
+    def save(self, *args, **kwargs):
+        # Пост и его счётчики (posts.signals) меняются в одной транзакции.
+        with transaction.atomic(using=kwargs.get('using'), savepoint=False):
+            super().save(*args, **kwargs)
+
     def __str__(self):
         if len(self.text) > SYMBOLS_COUNT:
             return self.text[0:SYMBOLS_COUNT] + '...'
@@ -38,4 +55,20 @@ class Post(models.Model):
             return self.text
 
     class Meta:
-        ordering = ['-pub_date']
+        ordering = ['-pub_date', '-id']
+        indexes = [
+            models.Index(fields=['-pub_date', '-id'],
+                         name='post_feed_idx'),
+            models.Index(fields=['author', '-pub_date', '-id'],
+                         name='post_author_feed_idx'),
+            models.Index(fields=['group', '-pub_date', '-id'],
+                         name='post_group_feed_idx'),
+        ]
+
+
+class PostCounter(models.Model):
+    key = models.CharField(max_length=64, unique=True)
+    count = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f'{self.key}: {self.count}'
@@ -0,0 +1,178 @@
+import re
+
+from django.db import connection
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import Post
+
+SNIPPET_TOKENS = 16
+# Управляющие символы вместо тегов: текст поста экранируется целиком,
+# и только потом маркеры заменяются на <mark>.
+MARK_START = '\x02'
+MARK_END = '\x03'
+
+WORD_RE = re.compile(r'\w+')
+
+
+def highlight(snippet):
+    return mark_safe(
+        escape(snippet)
+        .replace(MARK_START, '<mark>')
+        .replace(MARK_END, '</mark>')
+    )
+
+
+def index_post(post):
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'INSERT OR REPLACE INTO posts_post_fts(rowid, text) '
+            'VALUES (%s, %s)', [post.pk, post.text]
+        )
+
+
+def unindex_post(post_id):
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'DELETE FROM posts_post_fts WHERE rowid = %s', [post_id])
+
+
+def index_posts(posts):
+    """Добавляет в индекс посты из queryset одним INSERT ... SELECT."""
+    if connection.vendor != 'sqlite':
+        return
+    sql, params = posts.order_by().values('pk', 'text').query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT OR REPLACE INTO posts_post_fts(rowid, text) {sql}',
+            params)
+
+
+def rebuild_index():
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute('DELETE FROM posts_post_fts')
+        cursor.execute(
+            'INSERT INTO posts_post_fts(rowid, text) '
+            'SELECT id, text FROM posts_post'
+        )
+
+
+class SearchResults:
+    """Ленивая выдача поиска: Paginator берёт из неё count() и срезы."""
+
+    def __init__(self, query):
+        self.terms = WORD_RE.findall(query)
+
+    def count(self):
+        if not self.terms:
+            return 0
+        return self._count()
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            raise TypeError('SearchResults supports only slicing')
+        if not self.terms:
+            return []
+        rows = self._rows(index.start or 0, index.stop - (index.start or 0))
+        posts = Post.objects.feed().in_bulk([pk for pk, snippet in rows])
+        results = []
+        for pk, snippet in rows:
+            post = posts.get(pk)
+            if post is not None:
+                post.snippet = highlight(snippet)
+                results.append(post)
+        return results
+
+
+class SQLiteSearchResults(SearchResults):
+
+    @property
+    def match(self):
+        return ' '.join(
+            '"{}"'.format(term.replace('"', '""')) for term in self.terms)
+
+    def _count(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT COUNT(*) FROM posts_post_fts '
+                'WHERE posts_post_fts MATCH %s', [self.match]
+            )
+            return cursor.fetchone()[0]
+
+    def _rows(self, offset, limit):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT rowid, snippet(posts_post_fts, 0, %s, %s, %s, %s) '
+                'FROM posts_post_fts WHERE posts_post_fts MATCH %s '
+                'ORDER BY rank LIMIT %s OFFSET %s',
+                [MARK_START, MARK_END, '…', SNIPPET_TOKENS,
+                 self.match, limit, offset]
+            )
+            return cursor.fetchall()
+
+
+class PostgresSearchResults(SearchResults):
+    CONFIG = 'russian'
+
+    @property
+    def tsquery(self):
+        return ' & '.join(self.terms)
+
+    def _count(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT COUNT(*) FROM posts_post '
+                'WHERE to_tsvector(%s, text) @@ to_tsquery(%s, %s)',
+                [self.CONFIG, self.CONFIG, self.tsquery]
+            )
+            return cursor.fetchone()[0]
+
+    def _rows(self, offset, limit):
+        options = (f'StartSel={MARK_START}, StopSel={MARK_END}, '
+                   f'MaxWords={SNIPPET_TOKENS}, MinWords=5')
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT id, ts_headline(%s, text, query, %s) FROM ('
+                '  SELECT id, text, query,'
+                '    ts_rank(to_tsvector(%s, text), query) AS rank'
+                '  FROM posts_post, to_tsquery(%s, %s) AS query'
+                '  WHERE to_tsvector(%s, text) @@ query'
+                '  ORDER BY rank DESC LIMIT %s OFFSET %s'
+                ') AS ranked ORDER BY rank DESC',
+                [self.CONFIG, options, self.CONFIG, self.CONFIG,
+                 self.tsquery, self.CONFIG, limit, offset]
+            )
+            return cursor.fetchall()
+
+
+class FallbackSearchResults(SearchResults):
+
+    def queryset(self):
+        queryset = Post.objects.all()
+        for term in self.terms:
+            queryset = queryset.filter(text__icontains=term)
+        return queryset
+
+    def _count(self):
+        return self.queryset().count()
+
+    def _rows(self, offset, limit):
+        rows = self.queryset().values_list('pk', 'text')
+        return list(rows[offset:offset + limit])
+
+
+def search_posts(query):
+    backends = {
+        'sqlite': SQLiteSearchResults,
+        'postgresql': PostgresSearchResults,
+    }
+    return backends.get(connection.vendor, FallbackSearchResults)(query)
@@ -0,0 +1,185 @@
+from django.db.models.signals import (post_delete, post_init, post_save,
+                                      pre_delete, pre_save)
+from django.dispatch import receiver
+
+from . import caching, counters, search
+from .models import Group, Post, User
+
+COUNTED_FIELDS = ('author_id', 'group_id')
+# Поля пользователя, которые выводятся в лентах и на странице поста.
+RENDERED_USER_FIELDS = ('username', 'first_name', 'last_name')
+
+
+def _loaded_fields(instance):
+    # __dict__ вместо атрибутов: отложенные через only() поля
+    # не должны догружаться отдельным запросом.
+    return {field: instance.__dict__[field] for field in COUNTED_FIELDS
+            if field in instance.__dict__}
+
+
+def _counted_keys(fields):
+    return counters.post_keys(fields.get('author_id'), fields.get('group_id'))
+
+
+@receiver(post_init, sender=Post)
+def remember_loaded_state(sender, instance, **kwargs):
+    instance._counted_fields = _loaded_fields(instance)
+    instance._loaded_group_id = instance.__dict__.get('group_id')
+
+
+def _load_counted_fields(instance):
+    """Читает из базы прежние значения полей, отложенных при загрузке,
+    а потом прочитанных или присвоенных."""
+    missing = [field for field in COUNTED_FIELDS
+               if field in instance.__dict__
+               and field not in instance._counted_fields]
+    if missing:
+        row = Post.objects.filter(pk=instance.pk).values(*missing).first()
+        instance._counted_fields.update(row or {})
+        instance._loaded_group_id = instance._counted_fields.get('group_id')
+
+
+@receiver(pre_save, sender=Post)
+def load_reassigned_fields(sender, instance, raw=False, **kwargs):
+    # Присвоенное отложенное поле уйдёт в базу вместе с остальными.
+    if not raw and not instance._state.adding:
+        _load_counted_fields(instance)
+
+
+@receiver(pre_delete, sender=Post)
+def load_deferred_fields(sender, instance, **kwargs):
+    # После удаления строки отложенные поля уже не догрузить.
+    deferred = [field for field in COUNTED_FIELDS
+                if field not in instance.__dict__]
+    if deferred:
+        instance.refresh_from_db(fields=deferred)
+        instance._counted_fields.update(
+            (field, instance.__dict__[field]) for field in deferred)
+        instance._loaded_group_id = instance._counted_fields['group_id']
+    _load_counted_fields(instance)
+
+
+@receiver(post_save, sender=Post)
+def update_counters_on_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        counters.bump(_counted_keys(_loaded_fields(instance)), 1)
+    elif _loaded_fields(instance) != instance._counted_fields:
+        # Отложенные поля save() не пишет, они не менялись, но нужны
+        # для ключей счётчиков.
+        new = {field: getattr(instance, field) for field in COUNTED_FIELDS}
+        old_keys = set(_counted_keys(dict(new, **instance._counted_fields)))
+        new_keys = set(_counted_keys(new))
+        counters.bump(old_keys - new_keys, -1)
+        counters.bump(new_keys - old_keys, 1)
+    instance._counted_fields = _loaded_fields(instance)
+
+
+@receiver(post_delete, sender=Post)
+def update_counters_on_delete(sender, instance, **kwargs):
+    counters.bump(_counted_keys(instance._counted_fields), -1)
+
+
+@receiver(post_delete, sender=Group)
+def drop_group_counter(sender, instance, **kwargs):
+    # Посты группы переводятся в SET_NULL без сигналов Post,
+    # поэтому счётчик группы просто удаляется вместе с ней.
+    counters.drop([counters.group_key(instance.pk)])
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_feed_pages(sender, instance, **kwargs):
+    group_ids = {instance._loaded_group_id, instance.group_id} - {None}
+    scopes = [
+        caching.INDEX_SCOPE,
+        caching.profile_scope(instance.author.username),
+    ]
+    scopes.extend(
+        caching.group_scope(slug) for slug in
+        Group.objects.filter(pk__in=group_ids).values_list('slug', flat=True)
+    )
+    caching.invalidate_scopes(scopes)
+    instance._loaded_group_id = instance.group_id
+
+
+@receiver(post_init, sender=Group)
+def remember_group_slug(sender, instance, **kwargs):
+    instance._loaded_slug = instance.__dict__.get('slug')
+
+
+def _group_scopes(group, slugs):
+    """Страницы, на которых выводятся ссылки на группу: её лента,
+    главная и профили авторов её постов."""
+    usernames = (Post.objects.filter(group=group)
+                 .values_list('author__username', flat=True).distinct())
+    return [
+        caching.INDEX_SCOPE,
+        *(caching.group_scope(slug) for slug in slugs),
+        *(caching.profile_scope(username) for username in usernames),
+    ]
+
+
+@receiver(post_save, sender=Group)
+def invalidate_group_pages(sender, instance, created, **kwargs):
+    if created:
+        caching.invalidate_scopes([caching.group_scope(instance.slug)])
+    else:
+        caching.invalidate_scopes(_group_scopes(
+            instance, {instance._loaded_slug, instance.slug} - {None}))
+    instance._loaded_slug = instance.slug
+
+
+@receiver(pre_delete, sender=Group)
+def invalidate_deleted_group_pages(sender, instance, **kwargs):
+    # После удаления посты группы уже переведены в SET_NULL.
+    caching.invalidate_scopes(_group_scopes(instance, [instance.slug]))
+
+
+@receiver(post_init, sender=User)
+def remember_rendered_user_fields(sender, instance, **kwargs):
+    instance._rendered_fields = {
+        field: instance.__dict__.get(field) for field in RENDERED_USER_FIELDS}
+
+
+def _user_scopes(user, usernames):
+    """Страницы, на которых выводится имя пользователя: главная, его
+    профиль и ленты групп с его постами."""
+    slugs = (Group.objects.filter(posts__author=user)
+             .values_list('slug', flat=True).distinct())
+    return [
+        caching.INDEX_SCOPE,
+        *(caching.profile_scope(username) for username in usernames),
+        *(caching.group_scope(slug) for slug in slugs),
+    ]
+
+
+@receiver(post_save, sender=User)
+def invalidate_author_pages(sender, instance, created, **kwargs):
+    # Вход сохраняет last_login: ленты от этого не меняются.
+    rendered = {field: getattr(instance, field)
+                for field in RENDERED_USER_FIELDS}
+    if not created and rendered != instance._rendered_fields:
+        caching.invalidate_scopes(_user_scopes(
+            instance,
+            {instance._rendered_fields['username'], instance.username}
+            - {None}))
+    instance._rendered_fields = rendered
+
+
+@receiver(post_delete, sender=User)
+def invalidate_deleted_author_pages(sender, instance, **kwargs):
+    # Посты пользователя удалены каскадом и сбросили свои ленты сами.
+    caching.invalidate_scopes(_user_scopes(instance, [instance.username]))
+
+
+@receiver(post_save, sender=Post)
+def update_search_index(sender, instance, raw=False, **kwargs):
+    if not raw:
+        search.index_post(instance)
+
+
+@receiver(post_delete, sender=Post)
+def remove_from_search_index(sender, instance, **kwargs):
+    search.unindex_post(instance.pk)
@@ -0,0 +1,89 @@
+import json
+
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Group, Post, User
+from posts.tests.test_views import POST_TEXT
+
+TESTS_RECORDS_COUNT = 25
+
+
+class PostsApiTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(
+            username='AutoTestUser', first_name='Лев', last_name='Толстой')
+        cls.group = Group.objects.create(
+            title='Test group',
+            slug='test_slug',
+            description='This is a test group!',
+        )
+        Post.objects.bulk_create([
+            Post(
+                author=cls.user,
+                text=POST_TEXT.format(num + 1),
+                group=cls.group
+            ) for num in range(TESTS_RECORDS_COUNT)
+        ])
+
+    def setUp(self):
+        self.guest_client = Client()
+
+    def get_json(self, url, params=None):
+        response = self.guest_client.get(url, params or {})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        if response.streaming:
+            return json.loads(b''.join(response.streaming_content))
+        return json.loads(response.content)
+
+    def test_feeds_walk_all_posts_with_cursors(self):
+        """Ленты API проходят все посты по курсорам после
+        одного-двух запросов на страницу."""
+        urls = {
+            reverse('api:index'): 1,
+            reverse('api:group_list', args=(self.group.slug,)): 2,
+            reverse('api:profile', args=(self.user.username,)): 2,
+        }
+        expected = list(Post.objects.values_list('id', flat=True))
+        for url, queries in urls.items():
+            with self.subTest(url=url):
+                ids = []
+                params = {'limit': 10}
+                while True:
+                    with self.assertNumQueries(queries):
+                        data = self.get_json(url, params)
+                    ids.extend(post['id'] for post in data['results'])
+                    if data['next'] is None:
+                        break
+                    params = {'limit': 10, 'after': data['next']}
+                self.assertEqual(ids, expected)
+                back = self.get_json(
+                    url, {'limit': 10, 'before': data['previous']})
+                self.assertEqual(
+                    [post['id'] for post in back['results']],
+                    expected[10:20]
+                )
+
+    def test_post_detail(self):
+        """Пост отдаётся с автором и группой."""
+        post = Post.objects.first()
+        data = self.get_json(reverse('api:post_detail', args=(post.id,)))
+        self.assertEqual(data['text'], post.text)
+        self.assertEqual(data['author'], {
+            'username': self.user.username, 'full_name': 'Лев Толстой'})
+        self.assertEqual(data['group']['slug'], self.group.slug)
+
+    def test_unknown_objects_return_404(self):
+        """Несуществующие пост, группа и автор дают 404."""
+        urls = [
+            reverse('api:post_detail', args=(10 ** 6,)),
+            reverse('api:group_list', args=('missing',)),
+            reverse('api:profile', args=('missing',)),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertEqual(
+                    self.guest_client.get(url).status_code, 404)
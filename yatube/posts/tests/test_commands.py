@@ -0,0 +1,226 @@
+import csv
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db.models import Count
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts import benchmark, counters, search
+from posts.models import Group, Post, User
+from posts.tests.test_views import POST_TEXT
+from posts.utils import POSTS_PER_PAGE
+
+
+@override_settings(POSTS_PAGE_CACHE_TIMEOUT=60)
+class WarmCacheCommandTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='AutoTestUser')
+        cls.group = Group.objects.create(
+            title='Test group',
+            slug='test_slug',
+            description='This is a test group!',
+        )
+        for num in range(POSTS_PER_PAGE + 1):
+            Post.objects.create(
+                author=cls.user, text=POST_TEXT.format(num), group=cls.group)
+        cls.small_group = Group.objects.create(
+            title='Test group #2',
+            slug='test_slug2',
+            description='This is a test group #2!',
+        )
+        cls.small_author = User.objects.create_user(username='SmallAuthor')
+        Post.objects.create(author=cls.small_author, text=POST_TEXT.format(0),
+                            group=cls.small_group)
+
+    def setUp(self):
+        cache.clear()
+        counters.rebuild()
+        self.guest_client = Client()
+
+    def test_warm_cache_renders_feed_pages(self):
+        """После warm_cache первые страницы главной, самой большой группы
+        и самого активного автора отдаются из кеша."""
+        out = StringIO()
+        call_command('warm_cache', pages=2, groups=1, profiles=1, stdout=out)
+        self.assertIn('Прогрето страниц: 6', out.getvalue())
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:index') + '?page=2',
+            reverse('posts:group_list', args=(self.group.slug,)),
+            reverse('posts:profile', args=(self.user.username,)) + '?page=2',
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                with self.assertNumQueries(0):
+                    response = self.guest_client.get(url)
+                self.assertEqual(response.status_code, 200)
+        response = self.guest_client.get(
+            reverse('posts:group_list', args=(self.small_group.slug,)))
+        self.assertIsNotNone(response.context)
+
+
+class ExportPostsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_superuser(
+            username='AutoTestUser', email='a@a.ru', password='pass')
+        cls.group = Group.objects.create(
+            title='Test group',
+            slug='test_slug',
+            description='This is a test group!',
+        )
+        cls.post = Post.objects.create(
+            author=cls.user, text='Текст, с "кавычками"\nи переносом',
+            group=cls.group)
+        cls.post2 = Post.objects.create(
+            author=cls.user, text=POST_TEXT.format(2))
+
+    def test_export_ndjson(self):
+        """export_posts выгружает по строке JSON на пост."""
+        out = StringIO()
+        call_command('export_posts', stdout=out)
+        rows = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual([row['id'] for row in rows],
+                         [self.post.pk, self.post2.pk])
+        self.assertEqual(rows[0]['text'], self.post.text)
+        self.assertEqual(rows[0]['group'], self.group.slug)
+        self.assertIsNone(rows[1]['group'])
+
+    def test_export_csv(self):
+        """export_posts --format csv выгружает CSV с заголовком."""
+        out = StringIO()
+        call_command('export_posts', format='csv', stdout=out)
+        rows = list(csv.DictReader(StringIO(out.getvalue())))
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[0]['text'], self.post.text)
+        self.assertEqual(rows[0]['author'], self.user.username)
+
+    def test_admin_export_action_streams(self):
+        """Действие админки отдаёт выбранные посты потоком."""
+        client = Client()
+        client.force_login(self.user)
+        response = client.post(reverse('admin:posts_post_changelist'), {
+            'action': 'export_ndjson',
+            '_selected_action': [self.post2.pk],
+        })
+        self.assertTrue(response.streaming)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual([json.loads(line)['id'] for line in lines],
+                         [self.post2.pk])
+
+
+class ImportPostsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='AutoTestUser')
+
+    def import_posts(self, content, suffix, **options):
+        with tempfile.NamedTemporaryFile(
+                'w', suffix=suffix, encoding='utf-8', delete=False) as source:
+            source.write(content)
+        self.addCleanup(os.remove, source.name)
+        out = StringIO()
+        call_command('import_posts', source.name, stdout=out, **options)
+        return out.getvalue()
+
+    def test_import_ndjson_keeps_dates_and_creates_groups(self):
+        """import_posts загружает посты с датами из файла,
+        создаёт группы и обновляет счётчики."""
+        lines = [
+            {'text': POST_TEXT.format(num), 'author': self.user.username,
+             'pub_date': f'2020-01-0{num}T10:00:00+00:00',
+             'group': 'imported', 'group_title': 'Imported group'}
+            for num in range(1, 4)
+        ]
+        out = self.import_posts(
+            '\n'.join(json.dumps(line) for line in lines), '.ndjson',
+            batch_size=2)
+        self.assertIn('Загружено постов: 3', out)
+        group = Group.objects.get(slug='imported')
+        self.assertEqual(group.title, 'Imported group')
+        post = Post.objects.get(text=POST_TEXT.format(1))
+        self.assertEqual(post.pub_date.year, 2020)
+        self.assertEqual(post.updated, post.pub_date)
+        self.assertEqual(counters.get_group_count(group.pk), 3)
+        self.assertEqual(counters.get_author_count(self.user.pk), 3)
+
+    def test_bad_row_stops_import_after_loaded_batches(self):
+        """Ошибка в строке останавливает загрузку с CommandError, а уже
+        загруженные пакеты попадают в счётчики и поиск."""
+        lines = [json.dumps({'text': POST_TEXT.format(num),
+                             'author': self.user.username})
+                 for num in range(1, 3)]
+        for bad_line, message in (('{"text": "x"', 'Строка 3'),
+                                  ('{"text": "x"}', 'нет поля author'),
+                                  ('{"text": "x", "author": "AutoTestUser",'
+                                   ' "pub_date": "вчера"}', 'неверная дата')):
+            with self.subTest(bad_line=bad_line):
+                Post.objects.all().delete()
+                with self.assertRaisesMessage(CommandError, message):
+                    self.import_posts('\n'.join(lines + [bad_line]),
+                                      '.ndjson', batch_size=2)
+                self.assertEqual(Post.objects.count(), 2)
+                self.assertEqual(counters.get_author_count(self.user.pk), 2)
+                self.assertEqual(search.search_posts('Тестовый').count(), 2)
+
+    def test_export_import_csv_roundtrip(self):
+        """CSV из export_posts загружается обратно, неизвестные авторы
+        пропускаются без --create-authors."""
+        Post.objects.create(author=self.user, text=POST_TEXT.format(1))
+        out = StringIO()
+        call_command('export_posts', format='csv', stdout=out)
+        content = out.getvalue() + '99,text,,,ghost,,,,\n'
+        Post.objects.all().delete()
+        result = self.import_posts(content, '.csv')
+        self.assertIn('Пропущено строк без автора: 1', result)
+        self.assertEqual(
+            list(Post.objects.values_list('text', flat=True)),
+            [POST_TEXT.format(1)]
+        )
+        self.import_posts(content, '.csv', create_authors=True)
+        self.assertTrue(User.objects.filter(username='ghost').exists())
+
+
+class GenerateDataTests(TestCase):
+
+    def test_generate_data_is_reproducible_and_skewed(self):
+        """generate_data создаёт заданное число постов с перекосом
+        в сторону первых авторов, повторный запуск ничего не добавляет."""
+        call_command('generate_data', posts=500, authors=20, groups=5,
+                     stdout=StringIO())
+        self.assertEqual(Post.objects.count(), 500)
+        counts = list(
+            User.objects.annotate(posts_count=Count('posts'))
+            .order_by('-posts_count').values_list('posts_count', flat=True)
+        )
+        self.assertGreater(counts[0], 5 * counts[len(counts) // 2])
+        self.assertEqual(counters.get_all_count(), 500)
+        call_command('generate_data', posts=500, authors=20, groups=5,
+                     stdout=StringIO())
+        self.assertEqual(Post.objects.count(), 500)
+
+    def test_same_seed_generates_same_dataset(self):
+        """Тот же seed даёт тот же набор постов, другой — другой."""
+        def generate(seed):
+            Post.objects.all().delete()
+            call_command('generate_data', posts=200, authors=20, groups=5,
+                         seed=seed, stdout=StringIO())
+            return list(Post.objects.order_by('pub_date').values_list(
+                'text', 'pub_date', 'author__username', 'group__slug'))
+
+        dataset = generate(seed=1)
+        self.assertEqual(generate(seed=1), dataset)
+        self.assertNotEqual(generate(seed=2), dataset)
+
+    def test_benchmark_covers_every_posts_url(self):
+        """У каждого URL из posts.urls есть сценарий бенчмарка."""
+        benchmark.check_targets()
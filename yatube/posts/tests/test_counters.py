@@ -0,0 +1,102 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from posts import counters
+from posts.models import Group, Post, PostCounter, User
+from posts.tests.test_views import POST_TEXT
+
+
+class PostCountersTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='AutoTestUser')
+        cls.group = Group.objects.create(
+            title='Test group',
+            slug='test_slug',
+            description='This is a test group!',
+        )
+        cls.group2 = Group.objects.create(
+            title='Test group #2',
+            slug='test_slug2',
+            description='This is a test group #2!',
+        )
+
+    def assertCounters(self):
+        self.assertEqual(counters.get_all_count(), Post.objects.count())
+        self.assertEqual(
+            counters.get_author_count(self.user.pk),
+            Post.objects.filter(author=self.user).count()
+        )
+        for group in (self.group, self.group2):
+            self.assertEqual(
+                counters.get_group_count(group.pk),
+                Post.objects.filter(group=group).count()
+            )
+
+    def test_counters_follow_create_edit_delete(self):
+        """Счётчики меняются при создании, смене группы и удалении поста."""
+        self.assertCounters()
+        post = Post.objects.create(
+            author=self.user, text=POST_TEXT.format(1), group=self.group)
+        Post.objects.create(author=self.user, text=POST_TEXT.format(2))
+        self.assertCounters()
+        post = Post.objects.get(pk=post.pk)
+        post.group = self.group2
+        post.save()
+        self.assertCounters()
+        post.delete()
+        self.assertCounters()
+
+    def test_deferred_fields_do_not_drift(self):
+        """Сохранение и удаление поста, загруженного через only(),
+        не сбивает счётчики."""
+        post = Post.objects.create(
+            author=self.user, text=POST_TEXT.format(1), group=self.group)
+        self.assertCounters()
+        Post.objects.only('text').get(pk=post.pk).save()
+        self.assertCounters()
+        deferred = Post.objects.only('text').get(pk=post.pk)
+        deferred.group = self.group2
+        deferred.save()
+        self.assertCounters()
+        Post.objects.only('text').get(pk=post.pk).delete()
+        self.assertCounters()
+
+    def test_missing_counter_is_counted_once(self):
+        """Отсутствующий счётчик создаётся по числу постов и дальше
+        меняется вместе с ними."""
+        Post.objects.create(author=self.user, text=POST_TEXT.format(1))
+        PostCounter.objects.all().delete()
+        self.assertEqual(counters.get_author_count(self.user.pk), 1)
+        Post.objects.create(author=self.user, text=POST_TEXT.format(2))
+        self.assertEqual(counters.get_author_count(self.user.pk), 2)
+
+    def test_group_delete_drops_group_counter(self):
+        """Удаление группы (SET_NULL у постов) удаляет её счётчик,
+        не меняя остальных."""
+        group = Group.objects.create(
+            title='Test group #3',
+            slug='test_slug3',
+            description='This is a test group #3!',
+        )
+        Post.objects.create(
+            author=self.user, text=POST_TEXT.format(1), group=group)
+        self.assertEqual(counters.get_group_count(group.pk), 1)
+        group_pk = group.pk
+        group.delete()
+        self.assertFalse(PostCounter.objects.filter(
+            key=counters.group_key(group_pk)).exists())
+        self.assertEqual(counters.get_all_count(), 1)
+        self.assertEqual(counters.get_author_count(self.user.pk), 1)
+
+    def test_rebuild_command(self):
+        """Команда rebuild_post_counters восстанавливает счётчики."""
+        Post.objects.create(
+            author=self.user, text=POST_TEXT.format(1), group=self.group)
+        counters.get_all_count()
+        PostCounter.objects.update(count=100)
+        call_command('rebuild_post_counters', stdout=StringIO())
+        self.assertCounters()
@@ -0,0 +1,70 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Post, User
+from posts.utils import POSTS_PER_PAGE
+
+
+class PostsSearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='AutoTestUser')
+        cls.post = Post.objects.create(
+            author=cls.user,
+            text='Пишем <b>тесты</b> для поиска по Яндекс Практикуму',
+        )
+        Post.objects.create(author=cls.user, text='Совсем другой пост')
+
+    def setUp(self):
+        self.guest_client = Client()
+
+    def search(self, query, **params):
+        return self.guest_client.get(
+            reverse('posts:search'), {'q': query, **params})
+
+    def test_search_finds_post_and_highlights_terms(self):
+        """Поиск находит пост и подсвечивает совпадения,
+        экранируя текст поста."""
+        response = self.search('ТЕСТЫ поиска')
+        page_obj = response.context['page_obj']
+        self.assertEqual(page_obj.paginator.count, 1)
+        self.assertEqual(page_obj[0].pk, self.post.pk)
+        self.assertContains(response, '<mark>тесты</mark>')
+        self.assertContains(response, '&lt;b&gt;')
+        self.assertNotContains(response, '<b>тесты')
+
+    def test_search_index_follows_edit_and_delete(self):
+        """Индекс обновляется при редактировании и удалении поста."""
+        post = Post.objects.create(author=self.user, text='старый текст')
+        post.text = 'новый текст'
+        post.save()
+        self.assertEqual(
+            self.search('старый').context['page_obj'].paginator.count, 0)
+        self.assertEqual(
+            self.search('новый').context['page_obj'].paginator.count, 1)
+        post.delete()
+        self.assertEqual(
+            self.search('новый').context['page_obj'].paginator.count, 0)
+
+    def test_search_results_are_paginated(self):
+        """Выдача поиска разбита на страницы."""
+        Post.objects.bulk_create([
+            Post(author=self.user, text=f'массовый пост {num}')
+            for num in range(POSTS_PER_PAGE + 1)
+        ])
+        call_command('rebuild_search_index', stdout=StringIO())
+        response = self.search('массовый', page=2)
+        self.assertEqual(response.context['page_obj'].paginator.count,
+                         POSTS_PER_PAGE + 1)
+        self.assertEqual(len(response.context['page_obj']), 1)
+
+    def test_empty_query(self):
+        """Пустой и служебный запрос не ломают страницу поиска."""
+        for query in ('', '"*) OR', ' '):
+            with self.subTest(query=query):
+                response = self.search(query)
+                self.assertEqual(response.status_code, 200)
@@ -0,0 +1,168 @@
+from django.db import connection
+from django.test import Client, SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts import counters
+from posts.models import Group, Post, PostCounter, User
+from posts.tests.test_views import POST_TEXT
+from posts.utils import (CURSOR_MAX_PK, PAGE_RANGE_ELLIPSIS, POSTS_PER_PAGE,
+                         CursorPage, decode_cursor, elided_page_range,
+                         encode_cursor, make_cursor)
+
+TESTS_RECORDS_COUNT = 25
+
+
+class CursorPaginationTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='AutoTestUser')
+        cls.group = Group.objects.create(
+            title='Test group',
+            slug='test_slug',
+            description='This is a test group!',
+        )
+        posts = [
+            Post(
+                author=cls.user,
+                text=POST_TEXT.format(num + 1),
+                group=cls.group
+            ) for num in range(TESTS_RECORDS_COUNT)
+        ]
+        Post.objects.bulk_create(posts)
+
+    def setUp(self):
+        self.guest_client = Client()
+
+    def test_cursor_pages_cover_all_posts_once(self):
+        """Курсорная пагинация проходит все посты ровно один раз
+        на страницах index, group list и profile."""
+        templates_url_names = [
+            reverse('posts:index'),
+            reverse('posts:group_list', args=(self.group.slug,)),
+            reverse('posts:profile', args=(self.user.username,)),
+        ]
+        expected = list(
+            Post.objects.order_by('-pub_date', '-pk').values_list(
+                'text', flat=True)
+        )
+        for reverse_name in templates_url_names:
+            with self.subTest(reverse_name=reverse_name):
+                response = self.guest_client.get(reverse_name)
+                page_obj = response.context['page_obj']
+                texts = [post.text for post in page_obj]
+                params = {'after': encode_cursor(page_obj[-1])}
+                while params:
+                    response = self.guest_client.get(reverse_name, params)
+                    page_obj = response.context['page_obj']
+                    self.assertIsInstance(page_obj, CursorPage)
+                    texts.extend(post.text for post in page_obj)
+                    params = (
+                        {'after': page_obj.next_cursor}
+                        if page_obj.has_next() else None
+                    )
+                self.assertEqual(texts, expected)
+                self.assertEqual(
+                    len(page_obj), TESTS_RECORDS_COUNT % POSTS_PER_PAGE)
+
+    def test_cursor_previous_page(self):
+        """Ссылка «Предыдущая» курсорной страницы возвращает
+        предыдущие посты."""
+        url = reverse('posts:index')
+        first = self.guest_client.get(url).context['page_obj']
+        second = self.guest_client.get(
+            url, {'after': encode_cursor(first[-1])}
+        ).context['page_obj']
+        back = self.guest_client.get(
+            url, {'before': second.previous_cursor}
+        ).context['page_obj']
+        self.assertEqual(
+            [post.pk for post in back], [post.pk for post in first])
+        self.assertFalse(back.has_previous())
+        self.assertTrue(back.has_next())
+
+    def test_out_of_range_cursor_is_ignored(self):
+        """Курсор с pk вне диапазона INTEGER недействителен, и ленты
+        отдают первую страницу вместо ошибки."""
+        first = Post.objects.order_by('-pub_date', '-pk').first()
+        self.assertIsNotNone(decode_cursor(
+            make_cursor(first.pub_date, CURSOR_MAX_PK)))
+        for pk in (CURSOR_MAX_PK + 1, 10 ** 30, 0, -1):
+            cursor = make_cursor(first.pub_date, pk)
+            self.assertIsNone(decode_cursor(cursor))
+            for url in (
+                reverse('posts:index'),
+                reverse('posts:profile', args=(first.author.username,)),
+                reverse('api:index'),
+            ):
+                for param in ('after', 'before'):
+                    with self.subTest(pk=pk, url=url, param=param):
+                        response = self.guest_client.get(url, {param: cursor})
+                        self.assertEqual(response.status_code, 200)
+
+    def test_cursor_page_skips_count_query(self):
+        """Курсорная страница главной не выполняет COUNT(*)."""
+        counters.get_all_count()
+        first = Post.objects.order_by('-pub_date', '-pk').first()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.guest_client.get(
+                reverse('posts:index'), {'after': encode_cursor(first)}
+            )
+        for query in queries.captured_queries:
+            self.assertNotIn('COUNT(', query['sql'])
+        self.assertEqual(len(response.context['page_obj']), POSTS_PER_PAGE)
+
+
+class ElidedPageRangeTests(SimpleTestCase):
+
+    def test_short_range_is_not_elided(self):
+        """Короткий диапазон выводится целиком."""
+        self.assertEqual(list(elided_page_range(3, 7)), [1, 2, 3, 4, 5, 6, 7])
+
+    def test_long_range_is_windowed(self):
+        """Длинный диапазон сворачивается вокруг текущей страницы."""
+        dots = PAGE_RANGE_ELLIPSIS
+        for number, expected in (
+            (1, [1, 2, 3, dots, 100000]),
+            (4, [1, 2, 3, 4, 5, 6, dots, 100000]),
+            (500, [1, dots, 498, 499, 500, 501, 502, dots, 100000]),
+            (99997, [1, dots, 99995, 99996, 99997, 99998, 99999, 100000]),
+            (100000, [1, dots, 99998, 99999, 100000]),
+        ):
+            with self.subTest(number=number):
+                self.assertEqual(
+                    list(elided_page_range(number, 100000)), expected)
+
+    def test_ellipsis_never_hides_single_page(self):
+        """Многоточие не заменяет одну страницу: её номер выводится."""
+        dots = PAGE_RANGE_ELLIPSIS
+        for number, num_pages, expected in (
+            (5, 8, [1, 2, 3, 4, 5, 6, 7, 8]),
+            (4, 8, [1, 2, 3, 4, 5, 6, 7, 8]),
+            (6, 9, [1, dots, 4, 5, 6, 7, 8, 9]),
+            (4, 9, [1, 2, 3, 4, 5, 6, dots, 9]),
+        ):
+            with self.subTest(number=number, num_pages=num_pages):
+                self.assertEqual(
+                    list(elided_page_range(number, num_pages)), expected)
+
+
+class WindowedPaginatorTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='AutoTestUser')
+        Post.objects.create(author=cls.user, text=POST_TEXT.format(1))
+
+    def test_paginator_size_does_not_depend_on_page_count(self):
+        """Пагинатор выводит окно страниц, а не все номера."""
+        PostCounter.objects.update_or_create(
+            key=counters.ALL_POSTS_KEY,
+            defaults={'count': POSTS_PER_PAGE * 100000})
+        response = Client().get(reverse('posts:index') + '?page=500')
+        page_range = response.context['page_obj'].page_range
+        self.assertEqual(len(page_range), 9)
+        self.assertContains(response, 'href="?page=100000"', count=2)
+        self.assertContains(response, 'class="page-item', count=13)
+        self.assertLess(len(response.content), 8 * 1024)
@@ -1,8 +1,25 @@
+import os
+import tempfile
+import time
+import warnings
+
 from django import forms
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.cache.backends.base import CacheKeyWarning
 from django.db.models import Max
-from django.test import Client, TestCase
+from django.http import JsonResponse
+from django.test import (Client, RequestFactory, SimpleTestCase, TestCase,
+                         override_settings)
 from django.urls import reverse
 
+from core.tests.budgets import BUDGET_REPEAT, within_budgets
+from core.tests.transactions import run_on_commit
+from posts import counters
+from posts.caching import (INDEX_SCOPE, PAGE_LOCK_TIMEOUT, _acquire_lock,
+                           _lock_path, _release_lock, cache_anonymous_page,
+                           get_scope_version, invalidate_scopes,
+                           page_cache_key, post_fragment_key)
 from posts.models import Group, Post, User
 from posts.utils import POSTS_PER_PAGE
 
@@ -151,3 +168,399 @@ class PostsViewsTests(TestCase):
             with self.subTest(value=value):
                 form_field = response.context.get('form').fields.get(value)
                 self.assertIsInstance(form_field, expected)
+
+    def test_feed_pages_run_bounded_number_of_queries(self):
+        """Ленты и страница поста выполняют фиксированное число запросов,
+        не зависящее от количества постов на странице."""
+        post_id = Post.objects.all().aggregate(Max('id'))['id__max']
+        counters.get_all_count()
+        counters.get_group_count(self.group.pk)
+        counters.get_author_count(self.user.pk)
+        queries_url_names = {
+            reverse('posts:index'): 2,
+            reverse('posts:group_list', args=(self.group.slug,)): 3,
+            reverse('posts:profile', args=(self.user.username,)): 3,
+            reverse('posts:post_detail', args=(post_id,)): 3,
+        }
+        for reverse_name, queries in queries_url_names.items():
+            with self.subTest(reverse_name=reverse_name):
+                with self.assertNumQueries(queries):
+                    self.guest_client.get(reverse_name)
+
+    def test_authorized_pages_fit_budgets(self):
+        """Страницы постов укладываются в бюджеты core.tests.budgets
+        для авторизованного пользователя."""
+        counters.rebuild()
+        post_id = Post.objects.all().aggregate(Max('id'))['id__max']
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', args=(self.group.slug,)),
+            reverse('posts:profile', args=(self.user.username,)),
+            reverse('posts:post_detail', args=(post_id,)),
+            reverse('posts:post_create'),
+            reverse('posts:post_edit', args=(post_id,)),
+        )
+        with within_budgets():
+            for url in urls:
+                for _ in range(BUDGET_REPEAT):
+                    self.authorized_client.get(url)
+
+    def test_post_fragment_cache_is_invalidated_on_edit(self):
+        """Закешированный фрагмент поста обновляется после
+        редактирования через post_edit."""
+        post = Post.objects.create(
+            author=self.user,
+            text=POST_TEXT.format(TESTS_RECORDS_COUNT + 1),
+        )
+        response = self.guest_client.get(reverse('posts:index'))
+        self.assertContains(response, post.text)
+        self.assertIsNotNone(cache.get(post_fragment_key(post)))
+        self.authorized_client.post(
+            reverse('posts:post_edit', args=(post.id,)),
+            {'text': POST_TEXT.format(TESTS_RECORDS_COUNT + 2)},
+        )
+        response = self.guest_client.get(reverse('posts:index'))
+        self.assertContains(
+            response, POST_TEXT.format(TESTS_RECORDS_COUNT + 2))
+        self.assertNotContains(response, post.text)
+
+    def test_post_fragment_cache_follows_author_rename(self):
+        """Закешированный фрагмент поста показывает новое имя автора."""
+        author = User.objects.create_user(
+            username='RenamedUser', first_name='Старое', last_name='Имя')
+        Post.objects.create(
+            author=author, text=POST_TEXT.format(TESTS_RECORDS_COUNT + 1))
+        response = self.guest_client.get(reverse('posts:index'))
+        self.assertContains(response, 'Старое Имя')
+        author.username = 'NewUsername'
+        author.first_name = 'Новое'
+        author.save()
+        response = self.guest_client.get(reverse('posts:index'))
+        self.assertContains(response, 'Новое Имя')
+        self.assertContains(
+            response, reverse('posts:profile', args=('NewUsername',)))
+
+    def test_conditional_get_returns_not_modified(self):
+        """Повторный запрос с ETag получает 304, пока пост
+        или лента не изменились."""
+        post = Post.objects.create(
+            author=self.user,
+            text=POST_TEXT.format(TESTS_RECORDS_COUNT + 1),
+            group=self.group,
+        )
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:group_list', args=(self.group.slug,)),
+            reverse('posts:profile', args=(self.user.username,)),
+            reverse('posts:post_detail', args=(post.id,)),
+        ]
+        for client in (self.guest_client, self.authorized_client):
+            etags = {}
+            for url in urls:
+                with self.subTest(url=url):
+                    etags[url] = client.get(url)['ETag']
+                    response = client.get(
+                        url, HTTP_IF_NONE_MATCH=etags[url])
+                    self.assertEqual(response.status_code, 304)
+            with run_on_commit():
+                self.authorized_client.post(
+                    reverse('posts:post_edit', args=(post.id,)),
+                    {'text': POST_TEXT.format(TESTS_RECORDS_COUNT + 2),
+                     'group': self.group.pk},
+                )
+            for url in urls:
+                with self.subTest(url=url):
+                    response = client.get(
+                        url, HTTP_IF_NONE_MATCH=etags[url])
+                    self.assertEqual(response.status_code, 200)
+
+    def test_etags_follow_author_and_group_changes(self):
+        """ETag лент и поста меняются после правки имени автора,
+        слага группы и удаления группы."""
+        post_id = Post.objects.all().aggregate(Max('id'))['id__max']
+        index = reverse('posts:index')
+        profile = reverse('posts:profile', args=(self.user.username,))
+        detail = reverse('posts:post_detail', args=(post_id,))
+        # Свои копии: объекты класса общие для всех тестов.
+        user = User.objects.get(pk=self.user.pk)
+        group = Group.objects.get(pk=self.group.pk)
+
+        def assert_modified(urls, change):
+            etags = {url: self.guest_client.get(url)['ETag'] for url in urls}
+            with run_on_commit():
+                change()
+            for url in urls:
+                with self.subTest(url=url):
+                    response = self.guest_client.get(
+                        url, HTTP_IF_NONE_MATCH=etags[url])
+                    self.assertEqual(response.status_code, 200)
+
+        def rename_author():
+            user.first_name = 'Новое имя'
+            user.save()
+
+        def change_slug():
+            group.slug = 'new_slug'
+            group.save()
+
+        assert_modified((index, profile, detail), rename_author)
+        assert_modified((detail,), change_slug)
+        assert_modified((index, profile), group.delete)
+
+    @override_settings(POSTS_CONDITIONAL_GET=False)
+    def test_conditional_get_can_be_disabled(self):
+        """Без общего кеша ETag лент и поста не выдаются."""
+        post_id = Post.objects.all().aggregate(Max('id'))['id__max']
+        for url in (reverse('posts:index'),
+                    reverse('posts:post_detail', args=(post_id,))):
+            with self.subTest(url=url):
+                self.assertFalse(self.guest_client.get(url).has_header('ETag'))
+
+    def test_etag_depends_on_user(self):
+        """ETag страницы поста различается для гостя и автора."""
+        post_id = Post.objects.all().aggregate(Max('id'))['id__max']
+        url = reverse('posts:post_detail', args=(post_id,))
+        self.assertNotEqual(
+            self.guest_client.get(url)['ETag'],
+            self.authorized_client.get(url)['ETag'],
+        )
+
+
+@override_settings(POSTS_PAGE_CACHE_TIMEOUT=60)
+class PostsPageCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='AutoTestUser')
+        cls.group = Group.objects.create(
+            title='Test group',
+            slug='test_slug',
+            description='This is a test group!',
+        )
+        cls.group2 = Group.objects.create(
+            title='Test group #2',
+            slug='test_slug2',
+            description='This is a test group #2!',
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+        self.urls = {
+            'index': reverse('posts:index'),
+            'group': reverse('posts:group_list', args=(self.group.slug,)),
+            'group2': reverse('posts:group_list', args=(self.group2.slug,)),
+            'profile': reverse('posts:profile', args=(self.user.username,)),
+        }
+        for url in self.urls.values():
+            self.guest_client.get(url)
+
+    def test_anonymous_pages_are_served_from_cache(self):
+        """Повторный анонимный запрос к ленте не обращается к базе."""
+        for name, url in self.urls.items():
+            with self.subTest(name=name):
+                with self.assertNumQueries(0):
+                    response = self.guest_client.get(url)
+                self.assertEqual(response.status_code, 200)
+
+    def test_authorized_pages_are_not_cached(self):
+        """Страницы авторизованного пользователя не берутся из кеша."""
+        response = self.authorized_client.get(self.urls['index'])
+        self.assertIsNotNone(response.context)
+
+    def test_new_post_invalidates_only_affected_pages(self):
+        """Новый пост сбрасывает главную, профиль автора и его группу,
+        но не страницы других групп."""
+        with run_on_commit():
+            self.authorized_client.post(reverse('posts:post_create'), {
+                'text': POST_TEXT.format(1), 'group': self.group.pk})
+        for name in ('index', 'group', 'profile'):
+            with self.subTest(name=name):
+                response = self.guest_client.get(self.urls[name])
+                self.assertContains(response, POST_TEXT.format(1))
+        with self.assertNumQueries(0):
+            self.guest_client.get(self.urls['group2'])
+
+    def test_moving_post_invalidates_old_and_new_group(self):
+        """Перенос поста в другую группу сбрасывает страницы обеих групп."""
+        with run_on_commit():
+            post = Post.objects.create(
+                author=self.user, text=POST_TEXT.format(1), group=self.group)
+        self.guest_client.get(self.urls['group'])
+        with run_on_commit():
+            self.authorized_client.post(
+                reverse('posts:post_edit', args=(post.id,)),
+                {'text': POST_TEXT.format(2), 'group': self.group2.pk},
+            )
+        response = self.guest_client.get(self.urls['group'])
+        self.assertNotContains(response, POST_TEXT.format(2))
+        response = self.guest_client.get(self.urls['group2'])
+        self.assertContains(response, POST_TEXT.format(2))
+
+    def test_author_and_group_changes_refresh_cached_pages(self):
+        """Переименование автора и удаление группы сразу обновляют
+        закешированные главную, профиль и ленту группы."""
+        with run_on_commit():
+            Post.objects.create(
+                author=self.user, text=POST_TEXT.format(1), group=self.group)
+        for url in self.urls.values():
+            self.guest_client.get(url)
+        user = User.objects.get(pk=self.user.pk)
+        with run_on_commit():
+            user.first_name = 'Новое'
+            user.last_name = 'Имя'
+            user.save()
+        for name in ('index', 'profile', 'group'):
+            with self.subTest(name=name):
+                self.assertContains(
+                    self.guest_client.get(self.urls[name]), 'Новое Имя')
+        group_link = f'href="{self.urls["group"]}"'
+        with run_on_commit():
+            Group.objects.get(pk=self.group.pk).delete()
+        for name in ('index', 'profile'):
+            with self.subTest(name=name):
+                self.assertNotContains(
+                    self.guest_client.get(self.urls[name]), group_link)
+        self.assertEqual(
+            self.guest_client.get(self.urls['group']).status_code, 404)
+
+    def test_pages_are_invalidated_after_commit(self):
+        """Версия ленты меняется только после фиксации транзакции,
+        иначе другой воркер закешировал бы старые строки под новой."""
+        version = get_scope_version(INDEX_SCOPE)
+        with run_on_commit():
+            Post.objects.create(author=self.user, text=POST_TEXT.format(1))
+            self.assertEqual(get_scope_version(INDEX_SCOPE), version)
+            with self.assertNumQueries(0):
+                self.guest_client.get(self.urls['index'])
+        self.assertNotEqual(get_scope_version(INDEX_SCOPE), version)
+        self.assertContains(
+            self.guest_client.get(self.urls['index']), POST_TEXT.format(1))
+
+    def test_stale_page_is_served_while_another_worker_recomputes(self):
+        """Устаревшая копия отдаётся без запросов к базе, пока страницу
+        пересчитывает другой воркер; без блокировки она пересчитывается."""
+        url = self.urls['index']
+        key = page_cache_key(INDEX_SCOPE, RequestFactory().get(url))
+        version, content, headers, fresh_until = cache.get(key)
+        cache.set(key, (version, b'stale page', headers, 0))
+        cache.set(f'{key}:lock', 'other worker')
+        with self.assertNumQueries(0):
+            response = self.guest_client.get(url)
+        self.assertEqual(response.content, b'stale page')
+        cache.delete(f'{key}:lock')
+        response = self.guest_client.get(url)
+        self.assertEqual(response.content, content)
+        self.assertIsNone(cache.get(f'{key}:lock'))
+        self.assertGreater(cache.get(key)[-1], fresh_until - 1)
+
+    def test_previous_version_is_served_during_rebuild(self):
+        """После записи, пока страницу пересчитывает другой воркер,
+        отдаётся копия прежней версии со своим ETag."""
+        url = self.urls['index']
+        key = page_cache_key(INDEX_SCOPE, RequestFactory().get(url))
+        old_etag = self.guest_client.get(url)['ETag']
+        with run_on_commit():
+            Post.objects.create(author=self.user, text=POST_TEXT.format(1))
+        cache.set(f'{key}:lock', 'other worker')
+        with self.assertNumQueries(0):
+            response = self.guest_client.get(url)
+        self.assertNotContains(response, POST_TEXT.format(1))
+        self.assertEqual(response['ETag'], old_etag)
+        cache.delete(f'{key}:lock')
+        response = self.guest_client.get(url)
+        self.assertContains(response, POST_TEXT.format(1))
+        self.assertNotEqual(response['ETag'], old_etag)
+
+    def test_cold_page_does_not_release_foreign_lock(self):
+        """Без копии в кеше страница рендерится сразу, а чужая
+        блокировка пересчёта остаётся на месте."""
+        url = self.urls['index'] + '?page=2'
+        key = page_cache_key(INDEX_SCOPE, RequestFactory().get(url))
+        cache.set(f'{key}:lock', 'other worker')
+        response = self.guest_client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(cache.get(f'{key}:lock'), 'other worker')
+        self.assertIsNone(cache.get(key))
+
+    def test_cached_page_keeps_headers(self):
+        """Страница из кеша отдаётся с исходными заголовками."""
+        @cache_anonymous_page(lambda: INDEX_SCOPE)
+        def view(request):
+            response = JsonResponse({'page': 1})
+            response['X-Feed'] = 'index'
+            return response
+
+        request = RequestFactory().get('/feed/')
+        request.user = AnonymousUser()
+        view(request)
+        response = view(request)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(response['X-Feed'], 'index')
+        self.assertEqual(response.content, b'{"page": 1}')
+
+    def test_unknown_query_params_share_cache_entry(self):
+        """Посторонние параметры запроса не создают новых записей кеша."""
+        with self.assertNumQueries(0):
+            response = self.guest_client.get(
+                self.urls['index'], {'utm_source': 'mail'})
+        self.assertEqual(response.status_code, 200)
+        with self.assertNumQueries(0):
+            self.guest_client.get(self.urls['index'])
+        self.assertNotEqual(
+            page_cache_key(INDEX_SCOPE, RequestFactory().get(
+                self.urls['index'], {'page': 2})),
+            page_cache_key(INDEX_SCOPE, RequestFactory().get(
+                self.urls['index'])),
+        )
+
+    def test_non_ascii_scopes_make_valid_cache_keys(self):
+        """Кириллические слаги и имена не ломают ключи кеша."""
+        author = User.objects.create_user(username='автор')
+        with warnings.catch_warnings():
+            warnings.simplefilter('error', CacheKeyWarning)
+            Group.objects.create(
+                title='Кириллица', slug='Тестовый слаг',
+                description='Кириллица')
+            Post.objects.create(author=author, text=POST_TEXT.format(1))
+            response = self.guest_client.get(
+                reverse('posts:profile', args=(author.username,)))
+        self.assertContains(response, POST_TEXT.format(1))
+
+
+class FileCachePageLockTests(SimpleTestCase):
+
+    def setUp(self):
+        cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(cache_dir.cleanup)
+        settings = override_settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': cache_dir.name,
+        }})
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def test_page_lock_is_exclusive(self):
+        """В файловом кеше блокировку пересчёта берёт один воркер,
+        снять её может только владелец, а просроченную — перехватить."""
+        self.assertTrue(_acquire_lock('page:lock', 'first'))
+        self.assertFalse(_acquire_lock('page:lock', 'second'))
+        _release_lock('page:lock', 'second')
+        self.assertFalse(_acquire_lock('page:lock', 'second'))
+        _release_lock('page:lock', 'first')
+        self.assertTrue(_acquire_lock('page:lock', 'second'))
+        expired = time.time() - PAGE_LOCK_TIMEOUT - 1
+        os.utime(_lock_path('page:lock'), (expired, expired))
+        self.assertTrue(_acquire_lock('page:lock', 'third'))
+        _release_lock('page:lock', 'second')
+        self.assertTrue(os.path.exists(_lock_path('page:lock')))
+
+    def test_every_bump_gets_new_version(self):
+        """Каждый сброс даёт новую версию, даже одновременный."""
+        versions = {get_scope_version(INDEX_SCOPE)}
+        for _ in range(3):
+            invalidate_scopes([INDEX_SCOPE])
+            versions.add(get_scope_version(INDEX_SCOPE))
+        self.assertEqual(len(versions), 4)
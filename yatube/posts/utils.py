@@ -1,9 +1,185 @@
+import base64
+import binascii
+import collections.abc
+from datetime import datetime
+
 from django.core.paginator import Paginator
+from django.db.models import Q
+from django.utils.functional import cached_property
 
 POSTS_PER_PAGE = 10
+# Начиная с этой страницы ссылка «Следующая» ведёт в курсорный режим,
+# чтобы глубокие страницы не требовали OFFSET.
+CURSOR_PAGE_THRESHOLD = 10
+
+CURSOR_AFTER_PARAM = 'after'
+CURSOR_BEFORE_PARAM = 'before'
+# Больший pk не влезает в INTEGER базы: такой курсор недействителен.
+CURSOR_MAX_PK = 2 ** 63 - 1
+
+# Окно номеров страниц в пагинаторе: по PAGE_RANGE_ON_EACH_SIDE страниц
+# вокруг текущей и PAGE_RANGE_ON_ENDS с каждого края, остальное — «…».
+PAGE_RANGE_ON_EACH_SIDE = 2
+PAGE_RANGE_ON_ENDS = 1
+PAGE_RANGE_ELLIPSIS = '…'
+
+
+def make_cursor(pub_date, pk):
+    raw = f'{pub_date.isoformat()}|{pk}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def encode_cursor(post):
+    return make_cursor(post.pub_date, post.pk)
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        pub_date, pk = raw.rsplit('|', 1)
+        pub_date, pk = datetime.fromisoformat(pub_date), int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+    if not 1 <= pk <= CURSOR_MAX_PK:
+        return None
+    return pub_date, pk
+
+
+def keyset_slice(queryset, limit, after=None, before=None):
+    """Срез ленты по курсорам after/before в порядке (pub_date, id).
+
+    Возвращает срез и признак того, что он идёт в обратном порядке
+    (для before) и его нужно развернуть.
+    """
+    after = decode_cursor(after) if after else None
+    before = decode_cursor(before) if before else None
+    if before is not None:
+        pub_date, pk = before
+        queryset = queryset.filter(
+            Q(pub_date__gt=pub_date) | Q(pub_date=pub_date, pk__gt=pk)
+        ).order_by('pub_date', 'pk')
+        return queryset[:limit], True
+    if after is not None:
+        pub_date, pk = after
+        queryset = queryset.filter(
+            Q(pub_date__lt=pub_date) | Q(pub_date=pub_date, pk__lt=pk)
+        )
+    return queryset.order_by('-pub_date', '-pk')[:limit], False
+
+
+class CountedPaginator(Paginator):
+    """Paginator, которому общее число объектов передано заранее."""
+
+    def __init__(self, object_list, per_page, count, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.__dict__['count'] = count
+
+
+class CursorPaginator:
+    """Пагинация по ключу (pub_date, id) без COUNT(*) и OFFSET."""
+    is_cursor = True
+
+    def __init__(self, object_list, per_page, count=None):
+        self.object_list = object_list
+        self.per_page = per_page
+        if count is not None:
+            self.__dict__['count'] = count
+
+    @cached_property
+    def count(self):
+        return self.object_list.count()
+
+    def get_page(self, after=None, before=None):
+        queryset, backwards = keyset_slice(
+            self.object_list, self.per_page + 1, after, before)
+        rows = list(queryset)
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if backwards:
+            rows.reverse()
+            return CursorPage(rows, self, has_next=True,
+                              has_previous=has_more)
+        return CursorPage(rows, self, has_next=has_more,
+                          has_previous=bool(after and decode_cursor(after)))
+
+
+class CursorPage(collections.abc.Sequence):
+
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        self.object_list = object_list
+        self.paginator = paginator
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __repr__(self):
+        return f'<CursorPage of {len(self)} objects>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self._has_next and bool(self.object_list)
+
+    def has_previous(self):
+        return self._has_previous and bool(self.object_list)
+
+    def has_other_pages(self):
+        return self.has_previous() or self.has_next()
+
+    @property
+    def next_cursor(self):
+        return encode_cursor(self.object_list[-1]) if self.has_next() else None
+
+    @property
+    def previous_cursor(self):
+        if self.has_previous():
+            return encode_cursor(self.object_list[0])
+        return None
+
+
+def elided_page_range(number, num_pages, on_each_side=PAGE_RANGE_ON_EACH_SIDE,
+                      on_ends=PAGE_RANGE_ON_ENDS):
+    """Номера страниц вокруг текущей и по краям с многоточиями между ними;
+    длина не зависит от общего числа страниц."""
+    if num_pages <= (on_each_side + on_ends) * 2 + 1:
+        yield from range(1, num_pages + 1)
+        return
+    # Многоточие ставится, только если скрывает хотя бы две страницы:
+    # вместо одной проще вывести её номер.
+    if number > on_each_side + on_ends + 2:
+        yield from range(1, on_ends + 1)
+        yield PAGE_RANGE_ELLIPSIS
+        yield from range(number - on_each_side, number + 1)
+    else:
+        yield from range(1, number + 1)
+    if number < num_pages - on_each_side - on_ends - 1:
+        yield from range(number + 1, number + on_each_side + 1)
+        yield PAGE_RANGE_ELLIPSIS
+        yield from range(num_pages - on_ends + 1, num_pages + 1)
+    else:
+        yield from range(number + 1, num_pages + 1)
 
 
-def preparation_page_obj(request, post_list):
-    paginator = Paginator(post_list, POSTS_PER_PAGE)
-    page_number = request.GET.get('page')
-    return paginator.get_page(page_number)
+def preparation_page_obj(request, post_list, count=None):
+    after = request.GET.get(CURSOR_AFTER_PARAM)
+    before = request.GET.get(CURSOR_BEFORE_PARAM)
+    if after or before:
+        paginator = CursorPaginator(post_list, POSTS_PER_PAGE, count)
+        return paginator.get_page(after=after, before=before)
+    post_list = post_list.order_by('-pub_date', '-pk')
+    if count is None:
+        paginator = Paginator(post_list, POSTS_PER_PAGE)
+    else:
+        paginator = CountedPaginator(post_list, POSTS_PER_PAGE, count)
+    page_obj = paginator.get_page(request.GET.get('page'))
+    page_obj.page_range = list(
+        elided_page_range(page_obj.number, paginator.num_pages))
+    # Счётчик может опережать таблицу, и страница окажется пустой.
+    if (page_obj.number >= CURSOR_PAGE_THRESHOLD and page_obj.has_next()
+            and len(page_obj)):
+        page_obj.next_cursor = encode_cursor(page_obj[-1])
+    return page_obj
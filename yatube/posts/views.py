@@ -1,26 +1,41 @@
 from django.contrib.auth.decorators import login_required
+from django.core.paginator import Paginator
 from django.shortcuts import get_object_or_404, redirect, render
+from django.views.decorators.http import condition
 
+from core.routers import use_replica
+
+from . import counters
+from .caching import (INDEX_SCOPE, cache_anonymous_page, feed_etag,
+                      group_scope, post_detail_etag, profile_scope,
+                      scope_changed)
 from .forms import PostForm
 from .models import Group, Post, User
-from .utils import preparation_page_obj
+from .search import search_posts
+from .utils import POSTS_PER_PAGE, preparation_page_obj
 
 
+@use_replica(pinned=scope_changed(lambda: INDEX_SCOPE))
+@condition(etag_func=feed_etag(lambda: INDEX_SCOPE))
+@cache_anonymous_page(lambda: INDEX_SCOPE)
 def index(request):
-    post_list = Post.objects.select_related('group', 'author').all()
-    page_obj = preparation_page_obj(request, post_list)
+    post_list = Post.objects.feed()
+    page_obj = preparation_page_obj(request, post_list,
+                                    counters.get_all_count())
     context = {
         'page_obj': page_obj,
     }
     return render(request, 'posts/index.html', context)
 
 
+@use_replica(pinned=scope_changed(group_scope))
+@condition(etag_func=feed_etag(group_scope))
+@cache_anonymous_page(group_scope)
 def group_posts(request, slug):
-    group = get_object_or_404(Group.objects.prefetch_related('posts'),
-                              slug=slug
-                              )
-    posts = group.posts.all()
-    page_obj = preparation_page_obj(request, posts)
+    group = get_object_or_404(Group, slug=slug)
+    posts = Post.objects.feed().filter(group=group)
+    page_obj = preparation_page_obj(request, posts,
+                                    counters.get_group_count(group.pk))
     context = {
         'page_obj': page_obj,
         'group': group,
@@ -42,10 +57,14 @@ def post_create(request):
     return render(request, 'posts/create_post.html', context)
 
 
+@use_replica(pinned=scope_changed(profile_scope))
+@condition(etag_func=feed_etag(profile_scope))
+@cache_anonymous_page(profile_scope)
 def profile(request, username):
     user = get_object_or_404(User, username=username)
-    post_list = user.posts.all()
-    page_obj = preparation_page_obj(request, post_list)
+    post_list = Post.objects.feed().filter(author=user)
+    page_obj = preparation_page_obj(request, post_list,
+                                    counters.get_author_count(user.pk))
     context = {
         'author': user,
         'page_obj': page_obj,
@@ -69,11 +88,25 @@ def post_edit(request, post_id):
     return render(request, 'posts/create_post.html', context)
 
 
+# Любая запись поста сбрасывает главную, в том числе новый пост автора,
+# чьё число постов выводится на странице.
+@use_replica(pinned=scope_changed(lambda post_id: INDEX_SCOPE))
+@condition(etag_func=post_detail_etag)
 def post_detail(request, post_id):
-    post = get_object_or_404(Post.objects.select_related('group', 'author'),
-                             id=post_id
-                             )
+    post = get_object_or_404(Post.objects.feed(), id=post_id)
     context = {
         'post': post,
+        'author_posts_count': counters.get_author_count(post.author_id),
     }
     return render(request, 'posts/post_detail.html', context)
+
+
+def search(request):
+    query = request.GET.get('q', '').strip()
+    paginator = Paginator(search_posts(query), POSTS_PER_PAGE)
+    page_obj = paginator.get_page(request.GET.get('page'))
+    context = {
+        'query': query,
+        'page_obj': page_obj,
+    }
+    return render(request, 'posts/search.html', context)
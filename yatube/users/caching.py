@@ -0,0 +1,90 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.contrib import auth
+from django.contrib.auth import (BACKEND_SESSION_KEY, HASH_SESSION_KEY,
+                                 get_user_model)
+from django.core.cache import cache
+from django.utils.crypto import constant_time_compare
+
+# Поля пользователя, которые хранятся в кеше. Остальные, в том числе
+# хеш пароля, в кеш не попадают и читаются из базы при обращении.
+CACHED_FIELDS = ('id', 'username', 'first_name', 'last_name', 'email',
+                 'is_active', 'is_staff', 'is_superuser')
+
+
+def _session_user_key(session):
+    # Ключ сессии на подписанных куках длинный, поэтому хешируется.
+    digest = hashlib.md5(session.session_key.encode()).hexdigest()
+    return f'users:session-user:{digest}'
+
+
+def _version_key(user_id):
+    return f'users:user-version:{user_id}'
+
+
+def _new_version():
+    # Начальная версия из времени: если ключ версии вытеснен из кеша,
+    # закешированные раньше пользователи не станут снова актуальными.
+    return int(time.time() * 1000)
+
+
+def _cached_field_names():
+    # Model.from_db ждёт значения в порядке полей модели.
+    return [field.attname for field in get_user_model()._meta.concrete_fields
+            if field.attname in CACHED_FIELDS]
+
+
+def get_user(request):
+    """Пользователь сессии из кеша; при промахе — из базы через
+    django.contrib.auth.get_user с проверкой хеша пароля.
+
+    В кеше лежат CACHED_FIELDS и хеш сессии (HMAC хеша пароля), а не
+    сам пользователь. Кеш работает только при USER_CACHE_TIMEOUT > 0:
+    сброс после смены пароля или блокировки должен дойти до всех
+    процессов, поэтому кеш должен быть общим.
+    """
+    session = request.session
+    user_id = session.get(auth.SESSION_KEY)
+    if (not settings.USER_CACHE_TIMEOUT or user_id is None
+            or session.session_key is None):
+        return auth.get_user(request)
+    key = _session_user_key(session)
+    version_key = _version_key(user_id)
+    cached = cache.get_many([key, version_key])
+    version = cached.get(version_key)
+    if key in cached and version is not None:
+        values, session_hash, user_version = cached[key]
+        # Не загруженные поля отложены: save() запишет только
+        # CACHED_FIELDS, а пароль прочитается из базы при обращении.
+        user = get_user_model().from_db(None, _cached_field_names(), values)
+        if (user_version == version and str(user.pk) == str(user_id)
+                and session.get(BACKEND_SESSION_KEY)
+                in settings.AUTHENTICATION_BACKENDS
+                and constant_time_compare(
+                    session.get(HASH_SESSION_KEY, ''), session_hash)):
+            return user
+    user = auth.get_user(request)
+    if user.is_authenticated:
+        if version is None:
+            cache.add(version_key, _new_version(), None)
+            version = cache.get(version_key)
+        values = tuple(getattr(user, field)
+                       for field in _cached_field_names())
+        cache.set(key, (values, user.get_session_auth_hash(), version),
+                  settings.USER_CACHE_TIMEOUT)
+    return user
+
+
+def invalidate_user(user_id):
+    """Сбрасывает закешированного пользователя во всех его сессиях."""
+    try:
+        cache.incr(_version_key(user_id))
+    except ValueError:
+        cache.set(_version_key(user_id), _new_version(), None)
+
+
+def forget_session(session):
+    if session.session_key is not None:
+        cache.delete(_session_user_key(session))
@@ -0,0 +1,11 @@
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.utils.functional import SimpleLazyObject
+
+from .caching import get_user
+
+
+class CachedAuthenticationMiddleware(AuthenticationMiddleware):
+    """AuthenticationMiddleware, которая берёт пользователя из кеша."""
+
+    def process_request(self, request):
+        request.user = SimpleLazyObject(lambda: get_user(request))
@@ -0,0 +1,104 @@
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts import counters
+from posts.models import Post, User
+from posts.tests.test_views import POST_TEXT
+from users.caching import _session_user_key
+
+PASSWORD = 'Yatube-test-password-1'
+GUEST_INDEX_QUERIES = 2
+
+
+@override_settings(USER_CACHE_TIMEOUT=60)
+class CachedSessionUserTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(
+            username='AutoTestUser', password=PASSWORD)
+        Post.objects.create(author=cls.user, text=POST_TEXT.format(1))
+
+    def setUp(self):
+        cache.clear()
+        counters.rebuild()
+        self.authorized_client = Client()
+        self.authorized_client.login(
+            username=self.user.username, password=PASSWORD)
+
+    def get_user(self, client):
+        return client.get(reverse('posts:index')).context['user']
+
+    def test_logged_in_page_skips_session_and_user_queries(self):
+        """Страница авторизованного не читает сессию и пользователя
+        из базы."""
+        self.assertEqual(self.get_user(self.authorized_client), self.user)
+        with self.assertNumQueries(GUEST_INDEX_QUERIES):
+            user = self.get_user(self.authorized_client)
+        self.assertEqual(user, self.user)
+
+    @override_settings(
+        SESSION_ENGINE='django.contrib.sessions.backends.signed_cookies')
+    def test_signed_cookie_sessions(self):
+        """С сессиями в подписанной куке база тоже не читается."""
+        client = Client()
+        client.login(username=self.user.username, password=PASSWORD)
+        self.assertEqual(self.get_user(client), self.user)
+        with self.assertNumQueries(GUEST_INDEX_QUERIES):
+            self.assertEqual(self.get_user(client), self.user)
+
+    def test_password_change_logs_out_other_sessions(self):
+        """Смена пароля сбрасывает пользователя в других сессиях."""
+        other_client = Client()
+        other_client.login(username=self.user.username, password=PASSWORD)
+        self.assertEqual(self.get_user(other_client), self.user)
+        self.authorized_client.post(reverse('users:password_change'), {
+            'old_password': PASSWORD,
+            'new_password1': PASSWORD + '-new',
+            'new_password2': PASSWORD + '-new',
+        })
+        self.assertEqual(self.get_user(self.authorized_client), self.user)
+        self.assertFalse(self.get_user(other_client).is_authenticated)
+
+    def test_logout_forgets_cached_user(self):
+        """После выхода закешированный пользователь не возвращается."""
+        self.assertEqual(self.get_user(self.authorized_client), self.user)
+        session_cookie = self.authorized_client.cookies['sessionid'].value
+        self.authorized_client.get(reverse('users:logout'))
+        stale_client = Client()
+        stale_client.cookies['sessionid'] = session_cookie
+        self.assertFalse(self.get_user(stale_client).is_authenticated)
+        self.assertFalse(
+            self.get_user(self.authorized_client).is_authenticated)
+
+    def test_user_changes_are_visible(self):
+        """Правка пользователя сбрасывает его кеш."""
+        self.get_user(self.authorized_client)
+        self.user.first_name = 'Новое имя'
+        self.user.save()
+        self.assertEqual(
+            self.get_user(self.authorized_client).first_name, 'Новое имя')
+
+    def test_cache_keeps_no_password_hash(self):
+        """В кеше нет хеша пароля, а пароль закешированного пользователя
+        читается из базы и не затирается при сохранении."""
+        self.get_user(self.authorized_client)
+        entry = cache.get(
+            _session_user_key(self.authorized_client.session))
+        self.assertNotIn(self.user.password, repr(entry))
+        user = self.get_user(self.authorized_client)
+        self.assertTrue(user.check_password(PASSWORD))
+        user.first_name = 'Новое имя'
+        user.save()
+        saved = User.objects.get(pk=self.user.pk)
+        self.assertEqual(saved.password, self.user.password)
+        self.assertEqual(saved.date_joined, self.user.date_joined)
+        self.assertEqual(saved.first_name, 'Новое имя')
+
+    @override_settings(USER_CACHE_TIMEOUT=0)
+    def test_zero_timeout_disables_cache(self):
+        """Без общего кеша пользователь каждый раз читается из базы."""
+        self.get_user(self.authorized_client)
+        with self.assertNumQueries(GUEST_INDEX_QUERIES + 1):
+            self.assertEqual(self.get_user(self.authorized_client), self.user)
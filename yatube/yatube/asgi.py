@@ -0,0 +1,15 @@
+import os
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+
+try:
+    from django.core.asgi import get_asgi_application
+except ImportError:
+    # Django < 3.0: WSGI-приложение в пуле потоков под ASGI-сервером.
+    from django.core.wsgi import get_wsgi_application
+
+    from core.asgi import WsgiToAsgi
+
+    application = WsgiToAsgi(get_wsgi_application())
+else:
+    application = get_asgi_application()
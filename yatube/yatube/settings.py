@@ -1,5 +1,7 @@
 import os
 
+from core.template_build import is_fresh
+
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
@@ -23,6 +25,20 @@ ALLOWED_HOSTS = [
 LOGIN_URL = 'users:login'
 LOGIN_REDIRECT_URL = 'posts:index'
 
+# Доля запросов, которые замеряет core.middleware.InstrumentationMiddleware
+# (0 отключает замеры); перцентили по последним INSTRUMENTATION_WINDOW
+# запросам каждого представления отдаются по /internal/metrics/.
+INSTRUMENTATION_SAMPLE_RATE = float(os.environ.get(
+    'YATUBE_INSTRUMENTATION_SAMPLE_RATE', 1 if DEBUG else 0))
+INSTRUMENTATION_WINDOW = 1000
+
+# Запросы дольше SLOW_QUERY_MS (0 отключает журнал) пишутся в логгер
+# core.querylog с планом EXPLAIN и стеком, не чаще SLOW_QUERY_LOG_LIMIT
+# записей за SLOW_QUERY_LOG_PERIOD секунд на процесс.
+SLOW_QUERY_MS = float(os.environ.get('YATUBE_SLOW_QUERY_MS', 200))
+SLOW_QUERY_LOG_LIMIT = 10
+SLOW_QUERY_LOG_PERIOD = 60
+
 EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
@@ -43,11 +59,15 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.InstrumentationMiddleware',
+    'core.middleware.CompressionMiddleware',
+    'core.middleware.ReplicaPinMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.StaticAssetsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'users.middleware.CachedAuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -55,12 +75,28 @@ MIDDLEWARE = [
 ROOT_URLCONF = 'yatube.urls'
 
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
+# Шаблоны со встроенными include (manage.py build_templates). Без DEBUG
+# они ищутся раньше исходных, если собраны из текущих исходных; устаревшая
+# сборка не используется, и manage.py check предупреждает о ней (core.W001).
+# Все шаблоны без DEBUG разбираются один раз за процесс кеширующим
+# загрузчиком.
+TEMPLATES_BUILD_DIR = os.path.join(BASE_DIR, 'build', 'templates')
+TEMPLATES_DIRS = [TEMPLATES_DIR]
+if not DEBUG and is_fresh(TEMPLATES_BUILD_DIR, [TEMPLATES_DIR]):
+    TEMPLATES_DIRS.insert(0, TEMPLATES_BUILD_DIR)
+TEMPLATES_SOURCE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
-        'DIRS': [TEMPLATES_DIR],
-        'APP_DIRS': True,
+        'BACKEND': 'core.instrumentation.InstrumentedDjangoTemplates',
+        'DIRS': TEMPLATES_DIRS,
         'OPTIONS': {
+            'loaders': TEMPLATES_SOURCE_LOADERS if DEBUG else [
+                ('django.template.loaders.cached.Loader',
+                 TEMPLATES_SOURCE_LOADERS),
+            ],
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
@@ -74,17 +110,160 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'yatube.wsgi.application'
 
+# ASGI: uvicorn yatube.asgi:application. Сервер держит медленных клиентов
+# в цикле событий, а представления работают в пуле из ASGI_THREADS потоков;
+# потоковые ответы (выгрузка постов) занимают поток до конца отправки.
+ASGI_THREADS = int(os.environ.get('YATUBE_ASGI_THREADS', 8))
+
 
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
 
+# YATUBE_DB_ENGINE: sqlite (по умолчанию) или postgres (нужен psycopg2);
+# параметры подключения берутся из YATUBE_DB_NAME, YATUBE_DB_USER,
+# YATUBE_DB_PASSWORD, YATUBE_DB_HOST и YATUBE_DB_PORT. Соединения живут
+# YATUBE_DB_CONN_MAX_AGE секунд, а не открываются на каждый запрос.
+
+DATABASE_ENGINES = {
+    'sqlite': 'django.db.backends.sqlite3',
+    'postgres': 'django.db.backends.postgresql',
+}
+DATABASE_ENGINE = os.environ.get('YATUBE_DB_ENGINE', 'sqlite')
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'ENGINE': DATABASE_ENGINES[DATABASE_ENGINE],
+        'NAME': os.environ.get(
+            'YATUBE_DB_NAME',
+            os.path.join(BASE_DIR, 'db.sqlite3')
+            if DATABASE_ENGINE == 'sqlite' else 'yatube'),
+        'USER': os.environ.get('YATUBE_DB_USER', ''),
+        'PASSWORD': os.environ.get('YATUBE_DB_PASSWORD', ''),
+        'HOST': os.environ.get('YATUBE_DB_HOST', ''),
+        'PORT': os.environ.get('YATUBE_DB_PORT', ''),
+        'CONN_MAX_AGE': int(os.environ.get(
+            'YATUBE_DB_CONN_MAX_AGE', 0 if DEBUG else 60)),
+    }
+}
+
+# YATUBE_DB_REPLICAS: через запятую реплики основной базы (пути к файлам
+# для SQLite, хосты для Postgres). Ленты и страница поста читают с них
+# (core.routers), а после записи клиент REPLICA_PIN_SECONDS читает
+# с основной базы, как и все клиенты — изменённые ленты
+# (posts.caching.scope_changed), чтобы в кеш страниц и под новый ETag
+# не попадали данные отстающей реплики. В тестах реплики смотрят
+# в тестовую основную базу.
+DATABASE_REPLICAS = [
+    replica for replica in os.environ.get('YATUBE_DB_REPLICAS', '').split(',')
+    if replica
+]
+for number, replica in enumerate(DATABASE_REPLICAS, 1):
+    DATABASES[f'replica{number}'] = dict(
+        DATABASES['default'],
+        **{'NAME' if DATABASE_ENGINE == 'sqlite' else 'HOST': replica},
+        TEST={'MIRROR': 'default'},
+    )
+REPLICA_DATABASES = [f'replica{number}'
+                     for number in range(1, len(DATABASE_REPLICAS) + 1)]
+REPLICA_PIN_SECONDS = 15
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+
+# Прагмы для каждого нового соединения с SQLite (core.database): WAL
+# разрешает читать параллельно с записью, остальные снижают число
+# fsync и обращений к диску и ждут блокировку вместо ошибки.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'cache_size': -64 * 1024,
+    'mmap_size': 256 * 1024 * 1024,
+    'busy_timeout': 5000,
+    'temp_store': 'MEMORY',
+}
+
+
+# Cache
+# https://docs.djangoproject.com/en/2.2/topics/cache/
+# YATUBE_CACHE_BACKEND: locmem, file, memcached или redis (для redis нужен
+# пакет django-redis). По умолчанию без DEBUG — file: кеш общий для всех
+# воркеров одного сервера.
+
+CACHE_BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'file': 'django.core.cache.backends.filebased.FileBasedCache',
+    'memcached': 'django.core.cache.backends.memcached.MemcachedCache',
+    'redis': 'django_redis.cache.RedisCache',
+}
+CACHE_DEFAULT_LOCATIONS = {
+    'locmem': 'yatube',
+    'file': os.path.join(BASE_DIR, 'cache'),
+    'memcached': '127.0.0.1:11211',
+    'redis': 'redis://127.0.0.1:6379/1',
+}
+CACHE_BACKEND = os.environ.get(
+    'YATUBE_CACHE_BACKEND', 'locmem' if DEBUG else 'file')
+
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKENDS[CACHE_BACKEND],
+        'LOCATION': os.environ.get(
+            'YATUBE_CACHE_LOCATION', CACHE_DEFAULT_LOCATIONS[CACHE_BACKEND]),
+        'TIMEOUT': int(os.environ.get('YATUBE_CACHE_TIMEOUT', 60 * 15)),
+        'KEY_PREFIX': 'yatube',
     }
 }
 
+# Кеш страниц лент для анонимов: копия свежая POSTS_PAGE_CACHE_TIMEOUT
+# секунд (0 отключает кеш), после чего до POSTS_PAGE_CACHE_HARD_TIMEOUT
+# отдаётся устаревшей, пока один воркер её пересчитывает. Версии лент,
+# на которых держатся кеш страниц и ETag (POSTS_CONDITIONAL_GET), должны
+# быть общими для всех воркеров, поэтому на locmem без DEBUG они выключены.
+# Блокировка пересчёта на memcached и redis — атомарный add, а на file —
+# файл рядом с кешем (posts.caching), так как add там неатомарен.
+CACHE_IS_SHARED = CACHE_BACKEND != 'locmem'
+POSTS_PAGE_CACHE_TIMEOUT = 60 * 15 if CACHE_IS_SHARED and not DEBUG else 0
+POSTS_PAGE_CACHE_HARD_TIMEOUT = 60 * 60
+POSTS_CONDITIONAL_GET = CACHE_IS_SHARED or DEBUG
+
+
+# Logging
+# https://docs.djangoproject.com/en/2.2/topics/logging/
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'core.querylog': {
+            'handlers': ['console'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+    },
+}
+
+
+# Sessions
+# https://docs.djangoproject.com/en/2.2/topics/http/sessions/
+# YATUBE_SESSION_BACKEND: cached_db (по умолчанию, сессия читается из кеша),
+# signed_cookies (сессия в подписанной куке, без базы) или db. Пользователь
+# сессии кешируется на USER_CACHE_TIMEOUT секунд (users.caching) и
+# сбрасывается при сохранении пользователя и выходе. Сброс должен дойти
+# до всех процессов, поэтому с кешем в памяти процесса (locmem) кеш
+# пользователей отключён.
+
+SESSION_ENGINES = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+}
+SESSION_ENGINE = SESSION_ENGINES[
+    os.environ.get('YATUBE_SESSION_BACKEND', 'cached_db')]
+USER_CACHE_TIMEOUT = 60 * 15 if CACHE_IS_SHARED else 0
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -128,5 +307,14 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/2.2/howto/static-files/
 
 STATIC_URL = '/static/'
+STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 
 STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
+
+# Без DEBUG collectstatic добавляет к именам хеш содержимого и кладёт
+# рядом .gz и .br (нужен пакет brotli), а core.middleware.StaticAssetsMiddleware
+# отдаёт их из STATIC_ROOT с бессрочным Cache-Control. Файлы без хеша
+# кешируются на STATIC_MAX_AGE секунд.
+if not DEBUG:
+    STATICFILES_STORAGE = 'core.storage.CompressedManifestStaticFilesStorage'
+STATIC_MAX_AGE = 60 * 60
@@ -6,5 +6,7 @@ urlpatterns = [
     path('auth/', include('users.urls')),
     path('auth/', include('django.contrib.auth.urls')),
     path('about/', include('about.urls', namespace='about')),
+    path('internal/', include('core.urls', namespace='core')),
+    path('api/v1/', include('posts.api_urls', namespace='api')),
     path('', include('posts.urls'), name='posts'),
 ]